@@ -1,34 +1,47 @@
+import asyncio
+import re
+import hashlib
+import signal
 import subprocess
-import threading
 import os
 import time
-import json
 from datetime import datetime
 from typing import Optional, Dict, Any, List
 from pydantic import BaseModel, EmailStr
 from fastapi import FastAPI, Depends, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, StreamingResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from fastapi.security import OAuth2PasswordBearer, OAuth2PasswordRequestForm
-from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float # Added Float
+from sqlalchemy import create_engine, Column, Integer, String, Boolean, DateTime, ForeignKey, Text, Float, LargeBinary # Added Float
+from sqlalchemy import select, func, case, bindparam, delete as sql_delete, Index
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship, Session
-from passlib.context import CryptContext
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+import bcrypt
 from datetime import datetime, timedelta
 from fastapi.middleware.cors import CORSMiddleware
+import httpx
 import jwt
-from fastapi import Request
+from fastapi import Request, Response
 from google import genai
 from fastapi import Body
 from google.genai import types
+from google.genai import errors as genai_errors
 from dotenv import load_dotenv
 import logging
 import uuid
+import queue
+import random
 import sqlite3
-import pandas as pd
+import orjson
+import zstandard as zstd
 import sys
 from sqlalchemy import text
-from contextlib import asynccontextmanager
+from collections import OrderedDict
+from functools import lru_cache
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager, contextmanager
 
 # Configure logging
 logging.basicConfig(level=logging.INFO)
@@ -37,11 +50,55 @@ logger = logging.getLogger(__name__)
 load_dotenv()
 
 # Database setup
+# The sync engine stays for startup work (create_all, migrations); request
+# handlers go through the async engine so SQLite I/O no longer blocks the
+# event loop.
 DATABASE_URL = "sqlite:///./partners8_data.db"
-engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+ASYNC_DATABASE_URL = "sqlite+aiosqlite:///./partners8_data.db"
+engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False, "timeout": 30})
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Size the async pool above the default 5 so bursts of concurrent requests
+# queue on SQLite's write lock (bounded by the 30s busy timeout) instead of
+# deadlocking on pool checkout
+async_engine = create_async_engine(
+    ASYNC_DATABASE_URL,
+    pool_size=20,
+    max_overflow=10,
+    pool_timeout=30,
+    pool_pre_ping=True,
+    connect_args={"timeout": 30},
+)
+AsyncSessionLocal = async_sessionmaker(bind=async_engine, expire_on_commit=False)
 Base = declarative_base()
 
+# Pool of long-lived sqlite3 connections for the raw SQL paths. Opening a
+# connection per call rereads the file and throws away SQLite's page cache;
+# these are opened once in WAL mode so readers don't block the writer.
+class SqlitePool:
+    def __init__(self, database: str, size: int = 5):
+        self._pool = queue.Queue(maxsize=size)
+        for _ in range(size):
+            conn = sqlite3.connect(database, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA temp_store=MEMORY")
+            conn.execute("PRAGMA cache_size=-64000")
+            # mmap the DB file (up to 1 GiB) so reads come straight from the
+            # OS page cache instead of being copied into SQLite's page cache
+            conn.execute("PRAGMA mmap_size=1073741824")
+            conn.execute("PRAGMA cache_spill=OFF")
+            self._pool.put(conn)
+
+    @contextmanager
+    def acquire(self):
+        conn = self._pool.get()
+        try:
+            yield conn
+        finally:
+            self._pool.put(conn)
+
+db_pool = SqlitePool("partners8_data.db")
+
 # Models
 class User(Base):
     __tablename__ = "users"
@@ -51,28 +108,34 @@ class User(Base):
     password_hash = Column(String)
     role = Column(String, default="user")  # "admin" or "user"
     is_approved = Column(Boolean, default=False)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     created_by = Column(Integer, ForeignKey("users.id"), nullable=True)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     creator = relationship("User", remote_side=[id], backref="created_users")
-    chat_sessions = relationship("ChatSession", back_populates="user")
+    # lazy="raise" turns any accidental lazy load (a silent N+1) into a loud
+    # error; counts come from explicit GROUP BY queries instead
+    chat_sessions = relationship("ChatSession", back_populates="user", lazy="raise")
 
 class ChatSession(Base):
     __tablename__ = "chat_sessions"
+    # Serves the user_id filter + updated_at DESC ordering of /chat_sessions
+    __table_args__ = (Index("ix_chat_sessions_user_updated", "user_id", "updated_at"),)
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(String, unique=True, index=True, default=lambda: str(uuid.uuid4()))
     user_id = Column(Integer, ForeignKey("users.id"))
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
+    updated_at = Column(DateTime, default=datetime.utcnow, server_default=func.now(), onupdate=func.now())
 
     # Relationships
     user = relationship("User", back_populates="chat_sessions")
-    messages = relationship("ChatMessage", back_populates="session")
+    messages = relationship("ChatMessage", back_populates="session", lazy="raise")
 
 class ChatMessage(Base):
     __tablename__ = "chat_messages"
+    # Covers per-session counts and the id-keyset message pagination
+    __table_args__ = (Index("ix_chat_messages_session_id_id", "session_id", "id"),)
     id = Column(Integer, primary_key=True, index=True)
     session_id = Column(Integer, ForeignKey("chat_sessions.id"))
     message = Column(Text)
@@ -80,13 +143,26 @@ class ChatMessage(Base):
     is_grounded = Column(Boolean, default=False)
     grounding_metadata = Column(Text, nullable=True)  # JSON string
     sql_query = Column(Text, nullable=True)  # Store generated SQL query
-    query_results = Column(Text, nullable=True)  # Store SQL results as JSON
+    query_results = Column(LargeBinary, nullable=True)  # zstd-compressed JSON of SQL results
     query_type = Column(String, default="general")  # "general", "data_query", "grounded"
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
 
     # Relationships
     session = relationship("ChatSession", back_populates="messages")
 
+class UserStats(Base):
+    """Denormalized per-user chat counters, bumped at insert/delete time
+
+    Lets the user dashboard read one row instead of aggregating the
+    user's whole message history on every hit.
+    """
+    __tablename__ = "user_stats"
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    sessions_count = Column(Integer, default=0, nullable=False)
+    messages_count = Column(Integer, default=0, nullable=False)
+    grounded_count = Column(Integer, default=0, nullable=False)
+    data_query_count = Column(Integer, default=0, nullable=False)
+
 # Pydantic model for scraping status (used for global state)
 # 1. Enhanced ScrapingStatus model with progress fields
 class ScrapingStatus(BaseModel):
@@ -104,10 +180,12 @@ class ScrapingStatus(BaseModel):
 # 2. Enhanced ScrapingLog model with progress fields
 class ScrapingLog(Base):
     __tablename__ = "scraping_logs"
+    # The dashboard and log listing both order by started_at DESC
+    __table_args__ = (Index("ix_scraping_logs_started_at", "started_at"),)
     id = Column(Integer, primary_key=True, index=True)
     status = Column(String)
     started_by = Column(Integer, ForeignKey("users.id"))
-    started_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, default=datetime.utcnow, server_default=func.now())
     completed_at = Column(DateTime, nullable=True)
     error_message = Column(Text, nullable=True)
     records_processed = Column(Integer, default=0)
@@ -117,288 +195,172 @@ class ScrapingLog(Base):
     progress_percentage = Column(Float, nullable=True)
 
 
+# query_results codec: results are written once and read many times, so a
+# cheap zstd level keeps chat_messages rows small without hurting reads
+_ZSTD_COMPRESSOR = zstd.ZstdCompressor(level=3)
+_ZSTD_DECOMPRESSOR = zstd.ZstdDecompressor()
+
+def encode_query_results(results) -> bytes:
+    return _ZSTD_COMPRESSOR.compress(orjson.dumps(results))
+
+def decode_query_results(stored):
+    """Decode stored query results, tolerating legacy uncompressed JSON rows"""
+    if stored is None:
+        return None
+    if isinstance(stored, bytes):
+        try:
+            return orjson.loads(_ZSTD_DECOMPRESSOR.decompress(stored))
+        except zstd.ZstdError:
+            pass  # pre-compression row stored as raw JSON bytes
+    return orjson.loads(stored)
+
 # Global variables for scraping control
-scraping_process: Optional[subprocess.Popen] = None
+scraping_process: Optional[asyncio.subprocess.Process] = None
 scraping_status = ScrapingStatus(status="idle") # Initialize global status
-scraping_thread: Optional[threading.Thread] = None
-
-# 3. Progress file for communication between processes
-PROGRESS_FILE = "scraping_progress.json"
+scraping_task: Optional[asyncio.Task] = None
+
+# 3. Shared-memory progress region for communication between processes
+from progress_ipc import (
+    write_progress_file,
+    read_progress_file,
+    cleanup_progress_file,
+    progress_version,
+)
 
-def write_progress_file(status: str, current_step: int = None, step_name: str = None,
-                        records_processed: int = None, error_message: str = None):
-    """Write progress information to file for the main process to read"""
-    try:
-        progress_data = {
-            "status": status,
-            "current_step": current_step,
-            "total_steps": 6,
-            "step_name": step_name,
-            "records_processed": records_processed,
-            "error_message": error_message,
-            "timestamp": datetime.now().isoformat(),
-            "progress_percentage": (current_step / 6 * 100) if current_step else None
-        }
+# 4. Enhanced scraping process function
+async def run_scraping_script(user_id: int):
+    """Supervise the scraping subprocess, driven by its output instead of polling
+
+    The child is launched with asyncio.create_subprocess_exec and its
+    stdout/stderr are awaited line by line, so the event loop only wakes
+    when the scraper actually produces output; status is refreshed from the
+    shared progress region on each line.
+    """
+    global scraping_process
 
-        with open(PROGRESS_FILE, 'w') as f:
-            json.dump(progress_data, f)
-    except Exception as e:
-        logger.error(f"Failed to write progress file: {e}")
+    # Update status to running
+    scraping_status.status = "running"
+    scraping_status.started_at = datetime.now()
+    scraping_status.completed_at = None
+    scraping_status.error_message = None
+    scraping_status.records_processed = 0
+    scraping_status.current_step = 0
+    scraping_status.step_name = "Initializing"
+
+    write_progress_file("running", 0, "Initializing", 0)
+
+    # Verify script exists
+    script_path = "scrape.py"
+    if not os.path.exists(script_path):
+        error_msg = f"Script not found: {script_path}"
+        logger.error(error_msg)
+        scraping_status.status = "failed"
+        scraping_status.error_message = error_msg
+        write_progress_file("failed", 0, error_msg)
+        return error_msg
 
-def read_progress_file():
-    """Read progress information from file"""
+    # Start the scraper script
     try:
-        if os.path.exists(PROGRESS_FILE):
-            with open(PROGRESS_FILE, 'r') as f:
-                return json.load(f)
+        logger.info(f"Starting scraping script: {script_path}")
+        scraping_process = await asyncio.create_subprocess_exec(
+            sys.executable, script_path,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            env={**os.environ, 'PYTHONUNBUFFERED': '1'},
+            cwd=os.getcwd(),
+            start_new_session=True  # own process group, so stop can killpg the whole tree
+        )
+        logger.info(f"📍 Started scraping process with PID: {scraping_process.pid}")
     except Exception as e:
-        logger.error(f"Failed to read progress file: {e}")
-    return None
+        error_msg = f"Error starting scraping script: {e}"
+        logger.error(error_msg)
+        scraping_status.status = "failed"
+        scraping_status.error_message = error_msg
+        write_progress_file("failed", 0, error_msg)
+        return error_msg
 
-def cleanup_progress_file():
-    """Clean up progress file"""
-    try:
-        if os.path.exists(PROGRESS_FILE):
-            os.remove(PROGRESS_FILE)
-    except Exception as e:
-        logger.error(f"Failed to cleanup progress file: {e}")
+    stdout_lines = []
+    stderr_lines = []
 
-# 4. Enhanced scraping process function
-def run_scraping_script(user_id: int):
-    """Run the scraping script in a separate process with enhanced error handling"""
-    
-    # Initialize global variables
-    scraping_process = None
-    
-    # Initialize scraping status
-    class ScrapingStatus:
-        def __init__(self):
-            self.status = "idle"
-            self.started_at = None
-            self.completed_at = None
-            self.error_message = None
-            self.records_processed = 0
-            self.current_step = 0
-            self.total_steps = 6
-            self.step_name = "Initializing"
-    
-    scraping_status = ScrapingStatus()
-
-    try:
-        # Update status to running
-        scraping_status.status = "running"
-        scraping_status.started_at = datetime.now()
-        scraping_status.completed_at = None
-        scraping_status.error_message = None
-        scraping_status.records_processed = 0
-        scraping_status.current_step = 0
-        scraping_status.total_steps = 6
-        scraping_status.step_name = "Initializing"
-
-        # Write initial progress
+    def sync_status_from_progress():
+        """Refresh the in-process status from the shared progress region"""
         try:
-            write_progress_file("running", 0, "Initializing", 0)
-        except Exception as e:
-            logger.error(f"Failed to write initial progress: {e}")
-
-        # Verify script exists
-        script_path = "scrape.py"
-        if not os.path.exists(script_path):
-            error_msg = f"Script not found: {script_path}"
-            logger.error(error_msg)
-            scraping_status.status = "failed"
-            scraping_status.error_message = error_msg
-            write_progress_file("failed", 0, error_msg)
-            return error_msg
+            progress_data = read_progress_file()
+            if progress_data:
+                scraping_status.current_step = progress_data.get("current_step", 0)
+                scraping_status.step_name = progress_data.get("step_name", "Processing")
+                scraping_status.records_processed = progress_data.get("records_processed", 0)
 
-        # Start the scraper script with enhanced error capture
-        try:
-            logger.info(f"Starting scraping script: {script_path}")
-            
-            # Get the Python executable
-            python_executable = sys.executable
-            logger.info(f"Using Python executable: {python_executable}")
-            
-            # Start subprocess with proper error handling
-            scraping_process = subprocess.Popen(
-                [python_executable, script_path],
-                stdout=subprocess.PIPE,
-                stderr=subprocess.PIPE,
-                stdin=subprocess.PIPE,
-                text=True,
-                bufsize=1,
-                universal_newlines=True,
-                env={**os.environ, 'PYTHONUNBUFFERED': '1'},
-                cwd=os.getcwd()  # Ensure working directory is set
-            )
-            
-            logger.info(f"📍 Started scraping process with PID: {scraping_process.pid}")
-            
-        except FileNotFoundError as e:
-            error_msg = f"Python executable or script not found: {e}"
-            logger.error(error_msg)
-            scraping_status.status = "failed"
-            scraping_status.error_message = error_msg
-            write_progress_file("failed", 0, error_msg)
-            return error_msg
-            
+                new_status = progress_data.get("status")
+                if new_status and new_status != scraping_status.status and new_status != "stopped":
+                    scraping_status.status = new_status
         except Exception as e:
-            error_msg = f"Error starting scraping script: {e}"
-            logger.error(error_msg)
-            scraping_status.status = "failed"
-            scraping_status.error_message = error_msg
-            write_progress_file("failed", 0, error_msg)
-            return error_msg
+            logger.debug(f"Error reading progress region: {e}")
 
-        # Monitor the process with enhanced error capture
-        stdout_lines = []
-        stderr_lines = []
-        
-        # Read output in a non-blocking way
-        import threading
-        import queue
-        
-        def read_output(pipe, output_queue, stream_name):
-            """Read output from subprocess pipe"""
-            try:
-                while True:
-                    line = pipe.readline()
-                    if not line:
-                        break
-                    output_queue.put((stream_name, line.strip()))
-            except Exception as e:
-                output_queue.put((stream_name, f"Error reading {stream_name}: {e}"))
-        
-        # Create queues and threads for reading output
-        output_queue = queue.Queue()
-        stdout_thread = threading.Thread(
-            target=read_output, 
-            args=(scraping_process.stdout, output_queue, 'stdout')
-        )
-        stderr_thread = threading.Thread(
-            target=read_output, 
-            args=(scraping_process.stderr, output_queue, 'stderr')
-        )
-        
-        stdout_thread.daemon = True
-        stderr_thread.daemon = True
-        stdout_thread.start()
-        stderr_thread.start()
-        
-        # Monitor process
-        while scraping_process is not None and scraping_process.poll() is None:
-            # Check if we should stop
-            if scraping_status.status == "stopped":
-                logger.info("Stop signal received, terminating process")
+    async def drain(stream, sink, stream_name):
+        """Collect subprocess output as it arrives"""
+        while True:
+            line = await stream.readline()
+            if not line:
                 break
-            
-            # Read any available output
-            try:
-                while True:
-                    try:
-                        stream_name, line = output_queue.get_nowait()
-                        if stream_name == 'stdout':
-                            stdout_lines.append(line)
-                            logger.info(f"SCRAPE STDOUT: {line}")
-                        else:
-                            stderr_lines.append(line)
-                            logger.error(f"SCRAPE STDERR: {line}")
-                    except queue.Empty:
-                        break
-            except Exception as e:
-                logger.debug(f"Error reading output queue: {e}")
-            
-            # Read progress from file
-            try:
-                progress_data = read_progress_file()
-                if progress_data:
-                    scraping_status.current_step = progress_data.get("current_step", 0)
-                    scraping_status.step_name = progress_data.get("step_name", "Processing")
-                    scraping_status.records_processed = progress_data.get("records_processed", 0)
-                    
-                    # Update status if changed
-                    new_status = progress_data.get("status")
-                    if new_status and new_status != scraping_status.status and new_status != "stopped":
-                        scraping_status.status = new_status
-            except Exception as e:
-                logger.debug(f"Error reading progress file: {e}")
-            
-            time.sleep(1)  # Check every second
+            text_line = line.decode(errors="replace").strip()
+            if text_line:
+                sink.append(text_line)
+                if stream_name == "stdout":
+                    logger.info(f"SCRAPE STDOUT: {text_line}")
+                else:
+                    logger.error(f"SCRAPE STDERR: {text_line}")
+            sync_status_from_progress()
 
-        # Enhanced completion handling
-        if scraping_process is not None:
+    try:
+        proc = scraping_process
+        await asyncio.gather(
+            drain(proc.stdout, stdout_lines, "stdout"),
+            drain(proc.stderr, stderr_lines, "stderr"),
+        )
+        return_code = await proc.wait()
+        sync_status_from_progress()
+
+        # Update final status with detailed error information
+        scraping_status.completed_at = datetime.now()
+
+        if return_code == 0:
+            scraping_status.status = "completed"
+            # partners8_data was just rewritten; force a fresh schema prompt
+            invalidate_schema_cache()
+            # Try to get final record count
             try:
-                # Wait for process to complete with timeout
-                try:
-                    return_code = scraping_process.wait(timeout=10)
-                except subprocess.TimeoutExpired:
-                    logger.warning("Process didn't terminate cleanly, forcing termination")
-                    scraping_process.kill()
-                    return_code = scraping_process.wait()
-                
-                # Read any remaining output
-                try:
-                    remaining_stdout, remaining_stderr = scraping_process.communicate(timeout=5)
-                    if remaining_stdout:
-                        for line in remaining_stdout.split('\n'):
-                            if line.strip():
-                                stdout_lines.append(line.strip())
-                                logger.info(f"FINAL STDOUT: {line.strip()}")
-                    
-                    if remaining_stderr:
-                        for line in remaining_stderr.split('\n'):
-                            if line.strip():
-                                stderr_lines.append(line.strip())
-                                logger.error(f"FINAL STDERR: {line.strip()}")
-                except subprocess.TimeoutExpired:
-                    logger.warning("Timeout reading final output")
-                
-                # Update final status with detailed error information
-                scraping_status.completed_at = datetime.now()
-
-                if return_code == 0:
-                    scraping_status.status = "completed"
-                    # Try to get final record count
-                    try:
-                        if os.path.exists("partners8_final_data.csv"):
-                            df = pd.read_csv("partners8_final_data.csv")
-                            scraping_status.records_processed = len(df)
-                            logger.info(f"Final dataset contains {len(df)} records")
-                    except Exception as e:
-                        logger.warning(f"Could not read final CSV: {e}")
-                else:
-                    if scraping_status.status != "stopped":
-                        scraping_status.status = "failed"
-                        
-                        # Construct detailed error message
-                        error_parts = [f"Process ended with exit code {return_code}"]
-                        
-                        # Add stderr information
-                        if stderr_lines:
-                            error_parts.append("Recent errors:")
-                            error_parts.extend(stderr_lines[-5:])  # Last 5 lines
-                        
-                        # Add relevant stdout information
-                        error_stdout = [line for line in stdout_lines if any(keyword in line.lower() 
-                                      for keyword in ['error', 'exception', 'failed', 'traceback'])]
-                        if error_stdout:
-                            error_parts.append("Error details:")
-                            error_parts.extend(error_stdout[-3:])  # Last 3 error lines
-                        
-                        scraping_status.error_message = "\n".join(error_parts)
-                        
-                        # Log the detailed error
-                        logger.error(f"Scraping failed with exit code {return_code}")
-                        if stderr_lines:
-                            logger.error(f"Recent stderr: {stderr_lines[-3:]}")
-                        if error_stdout:
-                            logger.error(f"Error output: {error_stdout[-3:]}")
-                        
+                if os.path.exists("partners8_final_data.csv"):
+                    # Count data rows without loading the file into a DataFrame
+                    with open("partners8_final_data.csv") as f:
+                        record_count = max(sum(1 for _ in f) - 1, 0)
+                    scraping_status.records_processed = record_count
+                    logger.info(f"Final dataset contains {record_count} records")
             except Exception as e:
-                if scraping_status.status != "stopped":
-                    scraping_status.status = "failed"
-                    scraping_status.error_message = f"Error handling process completion: {str(e)}"
-                    logger.error(f"Error during process completion: {e}")
+                logger.warning(f"Could not read final CSV: {e}")
+        elif scraping_status.status != "stopped":
+            scraping_status.status = "failed"
+
+            # Construct detailed error message
+            error_parts = [f"Process ended with exit code {return_code}"]
+
+            if stderr_lines:
+                error_parts.append("Recent errors:")
+                error_parts.extend(stderr_lines[-5:])  # Last 5 lines
+
+            error_stdout = [line for line in stdout_lines if any(keyword in line.lower()
+                          for keyword in ['error', 'exception', 'failed', 'traceback'])]
+            if error_stdout:
+                error_parts.append("Error details:")
+                error_parts.extend(error_stdout[-3:])  # Last 3 error lines
+
+            scraping_status.error_message = "\n".join(error_parts)
+
+            logger.error(f"Scraping failed with exit code {return_code}")
+            if stderr_lines:
+                logger.error(f"Recent stderr: {stderr_lines[-3:]}")
+            if error_stdout:
+                logger.error(f"Error output: {error_stdout[-3:]}")
 
         # Log final status to DB
         try:
@@ -417,10 +379,10 @@ def run_scraping_script(user_id: int):
         try:
             cleanup_progress_file()
         except Exception as e:
-            logger.debug(f"Error cleaning up progress file: {e}")
-            
+            logger.debug(f"Error cleaning up progress region: {e}")
+
         scraping_process = None
-        
+
         # Return status message
         if scraping_status.status == "completed":
             return f"Scraping completed successfully! Processed {scraping_status.records_processed} records."
@@ -433,18 +395,16 @@ def run_scraping_script(user_id: int):
         scraping_status.status = "failed"
         scraping_status.completed_at = datetime.now()
         scraping_status.error_message = f"Pipeline exception: {str(e)}"
-        
-        # Log the full traceback for debugging
+
         import traceback
-        full_traceback = traceback.format_exc()
         logger.error(f"❌ Scraping script error: {e}")
-        logger.error(f"Full traceback: {full_traceback}")
-        
+        logger.error(f"Full traceback: {traceback.format_exc()}")
+
         try:
             write_progress_file("failed", scraping_status.current_step, f"Error: {str(e)}")
         except:
             pass
-        
+
         try:
             log_scraping_operation(
                 user_id,
@@ -456,12 +416,12 @@ def run_scraping_script(user_id: int):
             )
         except:
             pass
-        
+
         try:
             cleanup_progress_file()
         except:
             pass
-        
+
         scraping_process = None
         return f"Critical error: {str(e)}"
 
@@ -518,8 +478,9 @@ def debug_scrape_script():
             return False
         
         # Check for required files/directories
+        from progress_ipc import PROGRESS_SHM_FILE
         required_items = [
-            ("scraping_progress.json", "file", False),  # Optional
+            (PROGRESS_SHM_FILE, "file", False),  # Optional
             ("partners8_data", "dir", False),  # Will be created
             ("pipeline_state.pkl", "file", False),  # Optional
         ]
@@ -546,7 +507,7 @@ def debug_scrape_script():
         logger.error(f"❌ Debug check failed: {e}")
         return False
 
-def stop_scraping_process():
+async def stop_scraping_process():
     """Force stop the running scraping process"""
     global scraping_process, scraping_status
     
@@ -562,30 +523,29 @@ def stop_scraping_process():
     except:
         pass
     
-    # Kill the process if it exists
+    # Terminate the scraper's process group: SIGTERM first so it can clean
+    # up, SIGKILL after a short grace period if it's still around
     if scraping_process is not None:
         try:
-            # Just kill it - no checking, no waiting
-            scraping_process.kill()
-            logger.info("✅ Process killed")
-        except:
-            pass  # Ignore any errors, process might already be dead
-    
+            pgid = os.getpgid(scraping_process.pid)
+            os.killpg(pgid, signal.SIGTERM)
+            logger.info("✅ Sent SIGTERM to scraper process group")
+
+            # Event-driven wait on SIGCHLD: returns the instant the child
+            # exits instead of sleeping out a fixed grace period
+            try:
+                await asyncio.wait_for(scraping_process.wait(), timeout=2)
+            except asyncio.TimeoutError:
+                os.killpg(pgid, signal.SIGKILL)
+                logger.info("✅ Process group force-killed")
+        except ProcessLookupError:
+            pass  # Process already dead
+        except Exception as e:
+            logger.error(f"Error stopping scraping process: {e}")
+
     # Always reset to None
     scraping_process = None
-    
-    # Nuclear option: kill via system commands
-    try:
-        import os
-        import platform
-        
-        if platform.system() == "Windows":
-            os.system('taskkill /f /im python.exe >nul 2>&1')
-        else:
-            os.system('pkill -f scrape.py >/dev/null 2>&1')
-    except:
-        pass  # Ignore errors
-    
+
     logger.info("🛑 Stop completed")
 
 # 5. Enhanced log_scraping_operation function
@@ -594,36 +554,35 @@ def log_scraping_operation(user_id: int, status: str, error_message: Optional[st
                            step_name: str = None):
     """Log scraping operation to database with progress info"""
     try:
-        conn = sqlite3.connect("partners8_data.db")
-        cursor = conn.cursor()
-        created_at=datetime.now()
+        with db_pool.acquire() as conn:
+            cursor = conn.cursor()
+            created_at=datetime.now()
 
-        if status == "started":
-            cursor.execute('''
-                INSERT INTO scraping_logs (
-                    status, started_by,started_at, records_processed, current_step,
-                    total_steps, step_name, progress_percentage
-                )
-                VALUES (?, ?, ?, ?,?, ?, ?, ?)
-            ''', ("running", user_id,created_at, records_processed, current_step, 6, step_name,(current_step / 6 * 100) if current_step else 0))
-        else:
-            # Update the most recent log entry
-            cursor.execute('''
-                UPDATE scraping_logs
-                SET status = ?, completed_at = CURRENT_TIMESTAMP,
-                    error_message = ?, records_processed = ?,
-                    current_step = ?, step_name = ?, progress_percentage = ?
-                WHERE id = (
-                    SELECT id FROM scraping_logs
-                    WHERE started_by = ?
-                    ORDER BY started_at DESC
-                    LIMIT 1
-                )
-            ''', (status, error_message, records_processed, current_step, step_name,
-                  (current_step / 6 * 100) if current_step else 0, user_id))
+            if status == "started":
+                cursor.execute('''
+                    INSERT INTO scraping_logs (
+                        status, started_by,started_at, records_processed, current_step,
+                        total_steps, step_name, progress_percentage
+                    )
+                    VALUES (?, ?, ?, ?,?, ?, ?, ?)
+                ''', ("running", user_id,created_at, records_processed, current_step, 6, step_name,(current_step / 6 * 100) if current_step else 0))
+            else:
+                # Update the most recent log entry
+                cursor.execute('''
+                    UPDATE scraping_logs
+                    SET status = ?, completed_at = CURRENT_TIMESTAMP,
+                        error_message = ?, records_processed = ?,
+                        current_step = ?, step_name = ?, progress_percentage = ?
+                    WHERE id = (
+                        SELECT id FROM scraping_logs
+                        WHERE started_by = ?
+                        ORDER BY started_at DESC
+                        LIMIT 1
+                    )
+                ''', (status, error_message, records_processed, current_step, step_name,
+                      (current_step / 6 * 100) if current_step else 0, user_id))
 
-        conn.commit()
-        conn.close()
+            conn.commit()
     except Exception as e:
         logger.error(f"Error logging scraping operation: {e}") # Changed print to logger.error
 
@@ -631,10 +590,10 @@ def log_scraping_operation(user_id: int, status: str, error_message: Optional[st
 # 6. Enhanced database table creation
 def create_scraping_tables():
     """Create scraping-related tables with progress fields"""
-    conn = sqlite3.connect("partners8_data.db")
-    cursor = conn.cursor()
+    with db_pool.acquire() as conn:
+        cursor = conn.cursor()
 
-    cursor.execute('''
+        cursor.execute('''
         CREATE TABLE IF NOT EXISTS scraping_logs (
             id INTEGER PRIMARY KEY AUTOINCREMENT,
             status TEXT NOT NULL,
@@ -649,84 +608,107 @@ def create_scraping_tables():
             progress_percentage REAL NULL,
             FOREIGN KEY (started_by) REFERENCES users (id)
         )
-    ''')
-    conn.commit()
-    conn.close()
+        ''')
+        conn.commit()
 
 # Create tables and handle migrations
+# Columns added after the original schema shipped, keyed by table.
+# Existing databases are diffed against this map on startup.
+REQUIRED_COLUMNS = {
+    "users": {
+        "updated_at": "ALTER TABLE users ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP",
+    },
+    "chat_messages": {
+        "sql_query": "ALTER TABLE chat_messages ADD COLUMN sql_query TEXT",
+        "query_results": "ALTER TABLE chat_messages ADD COLUMN query_results TEXT",
+        "query_type": "ALTER TABLE chat_messages ADD COLUMN query_type TEXT DEFAULT 'general'",
+    },
+    "scraping_logs": {
+        "current_step": "ALTER TABLE scraping_logs ADD COLUMN current_step INTEGER NULL",
+        "total_steps": "ALTER TABLE scraping_logs ADD COLUMN total_steps INTEGER DEFAULT 6",
+        "step_name": "ALTER TABLE scraping_logs ADD COLUMN step_name TEXT NULL",
+        "progress_percentage": "ALTER TABLE scraping_logs ADD COLUMN progress_percentage REAL NULL",
+    },
+}
+
+# Indexes for the hot filter+order paths; create_all only builds these for
+# brand-new tables, so existing databases pick them up here instead
+REQUIRED_INDEXES = (
+    "CREATE INDEX IF NOT EXISTS ix_chat_sessions_user_updated ON chat_sessions (user_id, updated_at)",
+    "CREATE INDEX IF NOT EXISTS ix_chat_messages_session_id_id ON chat_messages (session_id, id)",
+    "CREATE INDEX IF NOT EXISTS ix_scraping_logs_started_at ON scraping_logs (started_at)",
+)
+
 def create_tables_and_migrate():
     """Create tables and handle database migrations"""
     Base.metadata.create_all(bind=engine)
     create_scraping_tables() # Call the new function here
 
-    db = SessionLocal()
     try:
-        # Check if updated_at column exists in users table
-        try:
-            db.execute(text("SELECT updated_at FROM users LIMIT 1"))
-        except Exception:
-            try:
-                db.execute(text('ALTER TABLE users ADD COLUMN updated_at DATETIME DEFAULT CURRENT_TIMESTAMP'))
-                db.commit()
-                logger.info("Added updated_at column to users table")
-            except Exception as e:
-                logger.error(f"Error adding updated_at column to users: {e}")
-
-        # Add new columns to chat_messages table
-        try:
-            db.execute(text("SELECT sql_query FROM chat_messages LIMIT 1"))
-        except Exception:
-            try:
-                db.execute(text('ALTER TABLE chat_messages ADD COLUMN sql_query TEXT'))
-                db.execute(text('ALTER TABLE chat_messages ADD COLUMN query_results TEXT'))
-                db.execute(text('ALTER TABLE chat_messages ADD COLUMN query_type TEXT DEFAULT \'general\''))
-                db.commit()
-                logger.info("Added new columns to chat_messages table")
-            except Exception as e:
-                logger.error(f"Error adding columns to chat_messages table: {e}")
-
-        # Add new columns to scraping_logs table if they don't exist
-        # This is for existing databases that might not have the new progress columns
-        try:
-            db.execute(text("SELECT current_step FROM scraping_logs LIMIT 1"))
-        except Exception:
-            try:
-                db.execute(text('ALTER TABLE scraping_logs ADD COLUMN current_step INTEGER NULL'))
-                db.execute(text('ALTER TABLE scraping_logs ADD COLUMN total_steps INTEGER DEFAULT 6'))
-                db.execute(text('ALTER TABLE scraping_logs ADD COLUMN step_name TEXT NULL'))
-                db.execute(text('ALTER TABLE scraping_logs ADD COLUMN progress_percentage REAL NULL'))
-                db.commit()
-                logger.info("Added new progress columns to scraping_logs table")
-            except Exception as e:
-                logger.error(f"Error adding progress columns to scraping_logs: {e}")
-
-        # Check and create other tables if needed
-        inspector = engine.dialect.get_table_names(db.connection())
-        required_tables = ['chat_sessions', 'chat_messages', 'scraping_logs']
-
-        for table in required_tables:
-            if table not in inspector:
-                logger.info(f"Creating missing table: {table}")
-
+        # One PRAGMA table_info per table, then only the ALTERs actually
+        # needed, all inside a single transaction -- no probe SELECTs, no
+        # exception-driven control flow
+        with engine.begin() as conn:
+            for table, columns in REQUIRED_COLUMNS.items():
+                existing = {row[1] for row in conn.execute(text(f"PRAGMA table_info({table})"))}
+                if not existing:
+                    continue  # table doesn't exist yet; create_all handles it
+                for column, ddl in columns.items():
+                    if column not in existing:
+                        conn.execute(text(ddl))
+                        logger.info(f"Added {column} column to {table} table")
+            for ddl in REQUIRED_INDEXES:
+                conn.execute(text(ddl))
+            # Seed counters for accounts with chat history that predate
+            # user_stats. Doing it here, before any traffic, means an
+            # incremental upsert is never the first write for such a user --
+            # otherwise a lone +1 would become the row and silently drop
+            # their entire prior history
+            conn.execute(text("""
+                INSERT INTO user_stats (user_id, sessions_count, messages_count, grounded_count, data_query_count)
+                SELECT s.user_id,
+                       COUNT(DISTINCT s.id),
+                       COUNT(m.id),
+                       COALESCE(SUM(CASE WHEN m.is_grounded = 1 THEN 1 ELSE 0 END), 0),
+                       COALESCE(SUM(CASE WHEN m.query_type = 'data_query' THEN 1 ELSE 0 END), 0)
+                FROM chat_sessions s
+                LEFT JOIN chat_messages m ON m.session_id = s.id
+                WHERE s.user_id NOT IN (SELECT user_id FROM user_stats)
+                GROUP BY s.user_id
+            """))
     except Exception as e:
         logger.error(f"Migration error: {e}")
-    finally:
-        db.close()
 
 create_tables_and_migrate()
 
 
 # Security and Authentication
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-change-in-production")
 ALGORITHM = "HS256"
 ACCESS_TOKEN_EXPIRE_MINUTES = 30
+# Work factor is deploy-tunable so operators can trade CPU for security margin
+BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return bcrypt.hashpw(password.encode(), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
+
+# Verified against when the username doesn't exist, so a login attempt costs
+# the same KDF time either way and can't be used to enumerate usernames
+_DUMMY_PASSWORD_HASH = bcrypt.hashpw(os.urandom(16), bcrypt.gensalt(rounds=BCRYPT_ROUNDS)).decode()
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    try:
+        return bcrypt.checkpw(plain_password.encode(), hashed_password.encode())
+    except ValueError:
+        return False  # malformed stored hash
+
+# bcrypt burns ~100-300ms of CPU per call; run it off the event loop so one
+# login doesn't stall every other in-flight request
+async def aget_password_hash(password: str) -> str:
+    return await asyncio.to_thread(get_password_hash, password)
+
+async def averify_password(plain_password: str, hashed_password: str) -> bool:
+    return await asyncio.to_thread(verify_password, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -739,31 +721,73 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     return encoded_jwt
 
 # Dependency to get database session
-def get_db():
-    db = SessionLocal()
-    try:
+async def get_db():
+    async with AsyncSessionLocal() as db:
         yield db
-    finally:
-        db.close()
+
+# One upsert keeps the user_stats counters current; callers commit with the
+# rest of their transaction so the row can never drift from the real tables
+_USER_STATS_UPSERT = text("""
+    INSERT INTO user_stats (user_id, sessions_count, messages_count, grounded_count, data_query_count)
+    VALUES (:u, :s, :m, :g, :d)
+    ON CONFLICT(user_id) DO UPDATE SET
+        sessions_count = sessions_count + :s,
+        messages_count = messages_count + :m,
+        grounded_count = grounded_count + :g,
+        data_query_count = data_query_count + :d
+""")
+
+async def bump_user_stats(db: AsyncSession, user_id: int, sessions: int = 0,
+                          messages: int = 0, grounded: int = 0, data_queries: int = 0):
+    """Apply increments (or decrements) to a user's denormalized chat counters"""
+    await db.execute(_USER_STATS_UPSERT, {
+        "u": user_id, "s": sessions, "m": messages, "g": grounded, "d": data_queries
+    })
 
 # Authentication dependencies
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+# Hottest query in the app (runs on every authenticated request): built once
+# at import, selecting only the columns handlers actually touch, so each call
+# skips ORM compilation and full-row hydration
+_AUTH_STMT = (
+    select(User.id, User.username, User.email, User.role, User.is_approved)
+    .where(User.username == bindparam("u"))
+    .limit(1)
+)
+
+# Verified-token memo: a decoded JWT is immutable until exp, so hot tokens
+# can skip base64 parsing + HMAC verification for a short window. Keyed by a
+# blake2b digest so the cache doesn't hold raw tokens.
+_jwt_cache: "OrderedDict[bytes, tuple]" = OrderedDict()  # digest -> (valid_until, payload)
+JWT_CACHE_TTL = 30  # seconds
+JWT_CACHE_MAX = 4096
+
+async def get_current_user(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_db)):
     credentials_exception = HTTPException(
         status_code=401,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
+    token_key = hashlib.blake2b(token.encode(), digest_size=16).digest()
+    now = time.time()
+    cached = _jwt_cache.get(token_key)
+    if cached is not None and now < cached[0]:
+        payload = cached[1]
+    else:
+        try:
+            payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
+        except jwt.PyJWTError:
             raise credentials_exception
-    except jwt.PyJWTError:
+        valid_until = min(now + JWT_CACHE_TTL, float(payload.get("exp", now + JWT_CACHE_TTL)))
+        _jwt_cache[token_key] = (valid_until, payload)
+        if len(_jwt_cache) > JWT_CACHE_MAX:
+            _jwt_cache.popitem(last=False)
+    username: str = payload.get("sub")
+    if username is None:
         raise credentials_exception
 
-    user = db.query(User).filter(User.username == username).first()
+    user = (await db.execute(_AUTH_STMT, {"u": username})).first()
     if user is None:
         raise credentials_exception
     if not user.is_approved:
@@ -776,24 +800,61 @@ def get_current_admin_user(current_user: User = Depends(get_current_user)):
     return current_user
 
 # Google AI Client Setup
+_genai_client: Optional[genai.Client] = None
+
+# Keep warm connections to Gemini between chat requests so repeat calls skip
+# the TCP+TLS handshake entirely; HTTP/2 multiplexes concurrent streams over
+# one connection instead of queueing behind each other
+_GENAI_HTTP_LIMITS = httpx.Limits(
+    max_keepalive_connections=64,
+    max_connections=128,
+    keepalive_expiry=60,
+)
+_GENAI_CLIENT_ARGS = {
+    "http2": True,
+    "limits": _GENAI_HTTP_LIMITS,
+    "timeout": httpx.Timeout(120.0, connect=10.0),
+}
+
 def get_genai_client():
-    """Initialize and return the Google GenAI client"""
+    """Return the shared Google GenAI client, creating it on first use
+
+    A single client keeps one HTTP connection pool alive for all requests
+    instead of paying TCP+TLS setup per call.
+    """
+    global _genai_client
+    if _genai_client is not None:
+        return _genai_client
     try:
         api_key = os.getenv("GEMINI_API_KEY")
         if not api_key:
             logger.error("GEMINI_API_KEY not found in environment variables")
             return None
-        client = genai.Client(api_key=api_key)
-        return client
+        _genai_client = genai.Client(
+            api_key=api_key,
+            http_options=types.HttpOptions(
+                client_args=_GENAI_CLIENT_ARGS,
+                async_client_args=_GENAI_CLIENT_ARGS,
+            ),
+        )
+        return _genai_client
     except Exception as e:
         logger.error(f"Failed to initialize GenAI client: {e}")
         return None
 
 # Database Schema Helper
+# Called from /database/info, both dashboards, and /health; the result only
+# changes after a scrape, so a short TTL saves a pool checkout + PRAGMA per hit
+_schema_info_cache: Optional[tuple] = None  # (built_at, schema_dict)
+SCHEMA_INFO_TTL = 60  # seconds
+
 def get_database_schema():
     """Get the database schema information for partners8_data table"""
+    global _schema_info_cache
+    if _schema_info_cache is not None and time.time() - _schema_info_cache[0] < SCHEMA_INFO_TTL:
+        return _schema_info_cache[1]
     try:
-        with sqlite3.connect("partners8_data.db") as conn:
+        with db_pool.acquire() as conn:
             cursor = conn.cursor()
 
             # Check if table exists
@@ -803,92 +864,266 @@ def get_database_schema():
 
             cursor.execute("PRAGMA table_info(partners8_data)")
             columns = cursor.fetchall()
-            cursor.execute("SELECT COUNT(*) FROM partners8_data")
-            total_rows = cursor.fetchone()[0]
+            # MAX(rowid) is an O(1) lookup; COUNT(*) scans the whole table.
+            # to_sql(index=False) assigns rowids 1..N, so this is the row count
+            cursor.execute("SELECT MAX(rowid) FROM partners8_data")
+            total_rows = cursor.fetchone()[0] or 0
 
-            return {
+            schema_data = {
                 'columns': columns,
                 'total_rows': total_rows
             }
+            _schema_info_cache = (time.time(), schema_data)
+            return schema_data
     except Exception as e:
         logger.error(f"Failed to get database schema: {e}")
         return None
 
+# Schema prompt cache: the schema only changes when a scrape rewrites
+# partners8_data, so rebuilding it (and hitting SQLite) per chat turn is waste
+_schema_cache: Optional[tuple] = None  # (built_at, schema_text)
+SCHEMA_CACHE_TTL = 300  # seconds
+
+_schema_version = 0  # bumped whenever partners8_data changes; keys NL→SQL cache
+
+def invalidate_schema_cache():
+    """Drop the cached schema prompt and info (call after partners8_data changes)"""
+    global _schema_cache, _schema_info_cache, _schema_version
+    _schema_cache = None
+    _schema_info_cache = None
+    _schema_version += 1
+
+# Static pieces of the schema prompt, rendered once at import time
+_SCHEMA_COLUMN_DESCRIPTIONS = {
+    'id': 'Primary key, auto-increment',
+    'ZipCode': 'Zillow ZipCode ID',
+    'SizeRank': 'City size ranking by population',
+    'RegionName': 'City name',
+    'State': 'US State abbreviation (e.g., CA, TX, NY)',
+    'County': 'County name',
+    'City': 'City name (same as RegionName)',
+    'ZMediumRent': 'Zillow median rent price in USD',
+    'ZMediumValue': 'Zillow median home value in USD',
+    'NMediumValue': 'NAR (Census) median home value in USD',
+    'entityid': 'HUD FIPS code for the area',
+    'IncomeLimits': 'HUD income limits for very low income (50% AMI, 4-person household)',
+    'Efficiency': 'HUD Fair Market Rent for efficiency apartment',
+    'OneBedroom': 'HUD Fair Market Rent for 1-bedroom apartment',
+    'TwoBedroom': 'HUD Fair Market Rent for 2-bedroom apartment',
+    'ThreeBedroom': 'HUD Fair Market Rent for 3-bedroom apartment',
+    'FourBedroom': 'HUD Fair Market Rent for 4-bedroom apartment',
+    'ZillowRatio': 'Monthly rent to home value ratio (Zillow data)',
+    'NARRatio': 'Monthly rent to home value ratio (NAR data)',
+    'ZH Ratio': 'HUD 4-bedroom rent to Zillow home value ratio',
+    'NH Ratio': 'HUD 4-bedroom rent to NAR home value ratio',
+    'created_at': 'Record creation timestamp',
+    'updated_at': 'Record update timestamp'
+}
+
+_SCHEMA_NOTES = """
+IMPORTANT NOTES:
+1. Use SQLite syntax
+2. All monetary values are in USD
+3. State codes are 2-letter abbreviations
+4. NULL values may exist in any column
+5. Ratios are decimal values (e.g., 0.01 = 1%)
+6. Only query the 'partners8_data' table
+7. Use proper WHERE clauses for filtering
+8. Consider using LIMIT for large result sets
+9. Use double quotes for column names with spaces like "ZH Ratio"
+"""
+
 def create_schema_prompt():
-    """Create a detailed schema prompt for Gemini"""
+    """Create a detailed schema prompt for Gemini (cached with a TTL)"""
+    global _schema_cache
+    if _schema_cache is not None and time.time() - _schema_cache[0] < SCHEMA_CACHE_TTL:
+        return _schema_cache[1]
+
     schema_data = get_database_schema()
     if not schema_data:
         return None
 
-    column_descriptions = {
-        'id': 'Primary key, auto-increment',
-        'ZipCode': 'Zillow ZipCode ID',
-        'SizeRank': 'City size ranking by population',
-        'RegionName': 'City name',
-        'State': 'US State abbreviation (e.g., CA, TX, NY)',
-        'County': 'County name',
-        'City': 'City name (same as RegionName)',
-        'ZMediumRent': 'Zillow median rent price in USD',
-        'ZMediumValue': 'Zillow median home value in USD',
-        'NMediumValue': 'NAR (Census) median home value in USD',
-        'entityid': 'HUD FIPS code for the area',
-        'IncomeLimits': 'HUD income limits for very low income (50% AMI, 4-person household)',
-        'Efficiency': 'HUD Fair Market Rent for efficiency apartment',
-        'OneBedroom': 'HUD Fair Market Rent for 1-bedroom apartment',
-        'TwoBedroom': 'HUD Fair Market Rent for 2-bedroom apartment',
-        'ThreeBedroom': 'HUD Fair Market Rent for 3-bedroom apartment',
-        'FourBedroom': 'HUD Fair Market Rent for 4-bedroom apartment',
-        'ZillowRatio': 'Monthly rent to home value ratio (Zillow data)',
-        'NARRatio': 'Monthly rent to home value ratio (NAR data)',
-        'ZH Ratio': 'HUD 4-bedroom rent to Zillow home value ratio',
-        'NH Ratio': 'HUD 4-bedroom rent to NAR home value ratio',
-        'created_at': 'Record creation timestamp',
-        'updated_at': 'Record update timestamp'
-    }
-
-    schema_text = "DATABASE SCHEMA FOR PARTNERS 8 REAL ESTATE DATA:\n\n"
-    schema_text += f"Table: partners8_data (Total rows: {schema_data['total_rows']:,})\n\nColumns:\n"
-
-    for col in schema_data['columns']:
-        col_name = col[1]
-        col_type = col[2]
-        description = column_descriptions.get(col_name, 'Real estate data field')
-        schema_text += f"- {col_name} ({col_type}): {description}\n"
-
-    schema_text += "\nIMPORTANT NOTES:\n"
-    schema_text += "1. Use SQLite syntax\n"
-    schema_text += "2. All monetary values are in USD\n"
-    schema_text += "3. State codes are 2-letter abbreviations\n"
-    schema_text += "4. NULL values may exist in any column\n"
-    schema_text += "5. Ratios are decimal values (e.g., 0.01 = 1%)\n"
-    schema_text += "6. Only query the 'partners8_data' table\n"
-    schema_text += "7. Use proper WHERE clauses for filtering\n"
-    schema_text += "8. Consider using LIMIT for large result sets\n"
-    schema_text += "9. Use double quotes for column names with spaces like \"ZH Ratio\"\n"
+    # list-append + join: O(N) instead of quadratic += concatenation
+    parts = [
+        "DATABASE SCHEMA FOR PARTNERS 8 REAL ESTATE DATA:\n",
+        f"Table: partners8_data (Total rows: {schema_data['total_rows']:,})\n\nColumns:",
+    ]
+    parts.extend(
+        f"- {col[1]} ({col[2]}): {_SCHEMA_COLUMN_DESCRIPTIONS.get(col[1], 'Real estate data field')}"
+        for col in schema_data['columns']
+    )
+    parts.append(_SCHEMA_NOTES)
+    schema_text = "\n".join(parts)
 
+    _schema_cache = (time.time(), schema_text)
     return schema_text
 
 # Smart Query Router
+DATA_KEYWORDS = (
+    'show', 'find', 'get', 'list', 'what are', 'which', 'how many', 'count',
+    'average', 'median', 'highest', 'lowest', 'top', 'bottom', 'compare',
+    'rent', 'price', 'value', 'income', 'city', 'state', 'expensive', 'cheap',
+    'affordable', 'ratio', 'bedroom', 'apartment', 'housing', 'real estate',
+    'zillow', 'hud', 'market', 'analysis', 'data', 'statistics', 'stats'
+)
+# Compiled once: a single pass over the message instead of ~30 substring scans
+DATA_KEYWORD_RE = re.compile(
+    r"\b(?:" + "|".join(map(re.escape, DATA_KEYWORDS)) + r")\b",
+    re.IGNORECASE,
+)
+
+@lru_cache(maxsize=4096)
+def _classify_data_query(normalized_message: str) -> bool:
+    return DATA_KEYWORD_RE.search(normalized_message) is not None
+
 def is_data_query(message: str) -> bool:
     """Determine if the message is asking for data analysis"""
-    data_keywords = [
-        'show', 'find', 'get', 'list', 'what are', 'which', 'how many', 'count',
-        'average', 'median', 'highest', 'lowest', 'top', 'bottom', 'compare',
-        'rent', 'price', 'value', 'income', 'city', 'state', 'expensive', 'cheap',
-        'affordable', 'ratio', 'bedroom', 'apartment', 'housing', 'real estate',
-        'zillow', 'hud', 'market', 'analysis', 'data', 'statistics', 'stats'
-    ]
+    # Retries and common questions repeat verbatim; memoize on the
+    # normalized text so they skip even the single regex pass
+    return _classify_data_query(message.strip().lower())
+
+# Sample-row rendering for /chat: fields shown and how each is formatted,
+# resolved once here instead of isinstance-checking every cell per turn
+def _format_sample_value(value):
+    if isinstance(value, (int, float)):
+        return f"${value:,.0f}" if value > 1000 else str(value)
+    return str(value)
+
+SAMPLE_KEY_FIELDS = ('ZipCode', 'RegionName', 'State', 'ZMediumRent', 'ZMediumValue', 'IncomeLimits')
+SAMPLE_FIELD_FORMATTERS = {
+    field: (str if field == 'State' else _format_sample_value)
+    for field in SAMPLE_KEY_FIELDS
+}
+
+# Transient Gemini failures (rate limits, 5xx, timeouts) get a short
+# exponential-backoff retry instead of surfacing as user-visible errors
+_GENAI_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+async def _genai_retry(call, attempts: int = 3, base: float = 0.5):
+    """Await call() with backoff on retryable API errors; re-raise the rest"""
+    for attempt in range(attempts):
+        try:
+            return await call()
+        except genai_errors.APIError as e:
+            if getattr(e, "code", None) not in _GENAI_RETRYABLE_STATUS or attempt == attempts - 1:
+                raise
+            logger.warning(f"Retryable Gemini error (attempt {attempt + 1}/{attempts}): {e}")
+        except asyncio.TimeoutError:
+            if attempt == attempts - 1:
+                raise
+            logger.warning(f"Gemini call timed out (attempt {attempt + 1}/{attempts})")
+        await asyncio.sleep(base * 2 ** attempt + random.uniform(0, base))
+
+# Micro-batcher for independent grounded queries: under concurrent load,
+# up to GROUNDED_BATCH_MAX /chat turns within a 25ms window are marshaled
+# into one numbered Gemini prompt and demultiplexed from its JSON answer
+# array, trading a little latency for far fewer API calls against the RPM
+# limit. Single arrivals go through untouched.
+GROUNDED_BATCH_MAX = 8
+GROUNDED_BATCH_WAIT = 0.025  # seconds
+
+_grounded_queue: Optional[asyncio.Queue] = None
+
+async def _grounded_batch_call(queries: List[str]) -> List[str]:
+    """Answer several independent queries with one grounded Gemini call"""
+    client = get_genai_client()
+    if not client:
+        raise Exception("Failed to initialize GenAI client")
+
+    numbered = "\n".join(f"[{i + 1}] {q}" for i, q in enumerate(queries))
+    prompt = (
+        "Answer each numbered query independently. "
+        "Respond with ONLY a JSON array of strings, one complete answer per "
+        "query, in the same order.\n" + numbered
+    )
+    config = types.GenerateContentConfig(
+        tools=[types.Tool(google_search=types.GoogleSearch())],
+        temperature=0.7,
+        max_output_tokens=1000 * len(queries),
+    )
+    response = await _genai_retry(lambda: client.aio.models.generate_content(
+        model="gemini-2.5-flash",
+        contents=prompt,
+        config=config,
+    ))
+    match = _FENCE_RE.search(response.text)
+    answers = orjson.loads((match.group(1) if match else response.text).strip())
+    if not isinstance(answers, list) or len(answers) != len(queries):
+        raise ValueError("batched response did not demultiplex")
+    return [str(a) for a in answers]
+
+async def _resolve_single(query: str, future: asyncio.Future):
+    try:
+        result = await search_with_google_grounding(query)
+        if not future.cancelled():
+            future.set_result(result)
+    except Exception as e:
+        if not future.cancelled():
+            future.set_exception(e)
+
+async def _grounded_batch_worker():
+    """Drain the grounded queue in small time-bounded batches"""
+    loop = asyncio.get_running_loop()
+    while True:
+        batch = [await _grounded_queue.get()]
+        deadline = loop.time() + GROUNDED_BATCH_WAIT
+        while len(batch) < GROUNDED_BATCH_MAX:
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_grounded_queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        batch = [(q, f) for q, f in batch if not f.cancelled()]
+        if not batch:
+            continue
+        if len(batch) == 1:
+            await _resolve_single(*batch[0])
+            continue
 
-    message_lower = message.lower()
-    return any(keyword in message_lower for keyword in data_keywords)
+        try:
+            answers = await _grounded_batch_call([q for q, _ in batch])
+            for (_, future), answer in zip(batch, answers):
+                if not future.cancelled():
+                    future.set_result({
+                        "response": answer,
+                        "is_grounded": True,
+                        "sources": [],
+                        "grounding_metadata": None,
+                    })
+        except Exception as e:
+            # Batch marshaling failed; answer each query individually
+            logger.warning(f"Grounded batch call failed, degrading to per-query calls: {e}")
+            await asyncio.gather(*(_resolve_single(q, f) for q, f in batch))
+
+async def grounded_search_batched(query: str) -> Dict[str, Any]:
+    """Grounded search, coalesced with concurrent calls when possible"""
+    if _grounded_queue is None:
+        return await search_with_google_grounding(query)
+    future = asyncio.get_running_loop().create_future()
+    _grounded_queue.put_nowait((query, future))
+    return await future
 
 # Enhanced Chat Functions
+# NL→SQL memo: the same questions recur constantly and each miss costs a
+# 500-1500ms Gemini round-trip plus quota. Keyed by the normalized question
+# and the schema version so entries die when a scrape changes the data.
+_nl2sql_cache: Dict[tuple, Dict[str, Any]] = {}
+NL2SQL_CACHE_MAX = 512
+
 async def natural_language_to_sql(user_question: str) -> Dict[str, Any]:
     """Convert natural language question to SQL query using Gemini"""
     schema_prompt = create_schema_prompt()
     if not schema_prompt:
         return {"success": False, "error": "Database schema not available"}
 
+    cache_key = (re.sub(r"\s+", " ", user_question.lower().strip()), _schema_version)
+    cached = _nl2sql_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
     prompt = f"""
 {schema_prompt}
 
@@ -904,6 +1139,7 @@ REQUIREMENTS:
 5. Handle potential NULL values properly
 6. Make sure column names match exactly (case-sensitive, use double quotes for columns with spaces)
 7. Start directly with SELECT
+8. If the question CANNOT be answered from the partners8_data table at all, respond with exactly NOT_DATA and nothing else
 
 
 Generate a complete, executable SQL query:
@@ -919,38 +1155,70 @@ Generate a complete, executable SQL query:
             max_output_tokens=500,
         )
 
-        response = client.models.generate_content(
+        # Stream the generation so execution can start as soon as a complete
+        # statement has arrived, while Gemini is still finishing the stream
+        chunks = []
+        sql_query = None
+        execution_task = None
+        async for chunk in await client.aio.models.generate_content_stream(
             model="gemini-2.5-flash",
             contents=prompt,
             config=config,
-        )
-
-        sql_query = clean_sql_query(response.text)
-        return {"success": True, "sql_query": sql_query}
+        ):
+            if not chunk.text:
+                continue
+            chunks.append(chunk.text)
+            # The model routes off-topic questions itself; bail out without
+            # paying for a doomed SQL execution and a second round-trip
+            if execution_task is None and "".join(chunks).lstrip().startswith("NOT_DATA"):
+                routed = {"success": False, "error": "Question routed to grounded search"}
+                if len(_nl2sql_cache) >= NL2SQL_CACHE_MAX:
+                    _nl2sql_cache.clear()
+                _nl2sql_cache[cache_key] = routed
+                return routed
+            if execution_task is None and ';' in chunk.text:
+                text_so_far = "".join(chunks)
+                candidate = clean_sql_query(text_so_far[:text_so_far.index(';') + 1])
+                if candidate.upper().startswith('SELECT'):
+                    sql_query = candidate
+                    execution_task = asyncio.create_task(execute_sql_query(sql_query))
+
+        if execution_task is None:
+            sql_query = clean_sql_query("".join(chunks))
+
+        if len(_nl2sql_cache) >= NL2SQL_CACHE_MAX:
+            _nl2sql_cache.clear()
+        _nl2sql_cache[cache_key] = {"success": True, "sql_query": sql_query}
+        # The in-flight task is per-call state; it must not land in the cache
+        return {"success": True, "sql_query": sql_query, "execution_task": execution_task}
 
     except Exception as e:
         logger.error(f"Error generating SQL query: {e}")
         return {"success": False, "error": str(e)}
 
+# Markdown code fence around Gemini's output, with or without a language tag
+# (sql, json, ...). A tag other than "sql" only counts when it sits alone on
+# the fence line, so a bare ```SELECT ...``` keeps its first keyword.
+_FENCE_RE = re.compile(r"```(?:sql\b|[a-zA-Z]+[ \t]*\n)?\s*(.*?)```", re.S | re.I)
+_SQL_KW = ('FROM', 'WHERE', 'GROUP', 'ORDER', 'LIMIT', 'HAVING')
+
 def clean_sql_query(sql_query: str) -> str:
     """Clean up the SQL query response from Gemini"""
-    sql_query = sql_query.strip()
-
-    if sql_query.startswith('```sql'):
-        sql_query = sql_query.replace('```sql', '').replace('```', '').strip()
-    elif sql_query.startswith('```'):
-        sql_query = sql_query.replace('```', '').strip()
+    match = _FENCE_RE.search(sql_query)
+    sql_query = (match.group(1) if match else sql_query).strip()
 
-    lines = sql_query.split('\n')
+    # Single pass over the lines, one upper() each: keep everything from the
+    # first SELECT on, plus stray clause lines Gemini emits before it
     sql_lines = []
     found_select = False
 
-    for line in lines:
+    for line in sql_query.split('\n'):
         line = line.strip()
-        if line.upper().startswith('SELECT') or found_select:
+        upper = line.upper()
+        if found_select or upper.startswith('SELECT'):
             found_select = True
             sql_lines.append(line)
-        elif any(keyword in line.upper() for keyword in ['FROM', 'WHERE', 'GROUP', 'ORDER', 'LIMIT', 'HAVING']):
+        elif upper.startswith(_SQL_KW):
             sql_lines.append(line)
 
     if sql_lines:
@@ -958,38 +1226,42 @@ def clean_sql_query(sql_query: str) -> str:
 
     return sql_query
 
-async def execute_sql_query(sql_query: str) -> Dict[str, Any]:
+def _execute_sql_query_sync(sql_query: str) -> Dict[str, Any]:
     """Execute the SQL query and return results"""
     try:
-        with sqlite3.connect("partners8_data.db") as conn:
-            df = pd.read_sql_query(sql_query, conn)
+        with db_pool.acquire() as conn:
+            cursor = conn.cursor()
+            cursor.execute(sql_query)
+            columns = [description[0] for description in cursor.description]
+            rows = cursor.fetchall()
 
-            # Convert DataFrame to list of dictionaries for JSON serialization
-            results = df.to_dict('records')
+            # Build plain dicts straight from the cursor for JSON serialization
+            results = [dict(zip(columns, row)) for row in rows]
 
             return {
                 "success": True,
                 "results": results,
                 "row_count": len(results),
-                "columns": list(df.columns)
+                "columns": columns
             }
     except Exception as e:
         logger.error(f"Error executing SQL query: {e}")
         return {"success": False, "error": str(e)}
 
-async def summarize_query_results(user_question: str, sql_query: str, results: List[Dict]) -> str:
-    """Use Gemini to summarize the query results"""
-    if len(results) == 0:
-        return "No results found for your query."
+async def execute_sql_query(sql_query: str) -> Dict[str, Any]:
+    """Run the query in a worker thread so it can overlap other awaits"""
+    return await asyncio.to_thread(_execute_sql_query_sync, sql_query)
 
+def _summary_prompt(user_question: str, sql_query: str, results: List[Dict]) -> str:
+    """Build the results-summary prompt (shared by batch and streaming paths)"""
     # Limit data for summary to avoid token limits
     display_results = results[:10]
-    results_text = json.dumps(display_results, indent=2, default=str)
+    results_text = orjson.dumps(display_results, option=orjson.OPT_INDENT_2, default=str).decode()
 
     if len(results) > 10:
         results_text += f"\n... and {len(results) - 10} more rows"
 
-    prompt = f"""
+    return f"""
 ORIGINAL QUESTION: "{user_question}"
 SQL QUERY: {sql_query}
 RESULTS ({len(results)} total rows): {results_text}
@@ -997,6 +1269,13 @@ RESULTS ({len(results)} total rows): {results_text}
 Provide a clear, concise summary of these results in 2-3 sentences. Focus on key insights and patterns. Include specific numbers and findings.
 """
 
+async def summarize_query_results(user_question: str, sql_query: str, results: List[Dict]) -> str:
+    """Use Gemini to summarize the query results"""
+    if len(results) == 0:
+        return "No results found for your query."
+
+    prompt = _summary_prompt(user_question, sql_query, results)
+
     try:
         client = get_genai_client()
         if not client:
@@ -1007,11 +1286,11 @@ Provide a clear, concise summary of these results in 2-3 sentences. Focus on key
             max_output_tokens=300,
         )
 
-        response = client.models.generate_content(
+        response = await _genai_retry(lambda: client.aio.models.generate_content(
             model="gemini-2.5-flash",
             contents=prompt,
             config=config,
-        )
+        ))
 
         return response.text.strip()
     except Exception as e:
@@ -1019,8 +1298,22 @@ Provide a clear, concise summary of these results in 2-3 sentences. Focus on key
         return f"Results found ({len(results)} rows) but unable to generate summary: {str(e)}"
 
 # Enhanced Google Grounding Search Function
+# Grounded-response memo: identical queries repeat constantly in dev and
+# demo sessions, and each miss is a full grounded Gemini round-trip. Entries
+# carry the whole response dict so /chat replays sources without rebuilding.
+_grounding_cache: Dict[str, tuple] = {}  # key -> (cached_at, response dict)
+GROUNDING_CACHE_TTL = 3600  # seconds
+GROUNDING_CACHE_MAX = 10000
+
 async def search_with_google_grounding(query: str) -> Dict[str, Any]:
     """Search using Google Grounding API with the new library"""
+    cache_key = hashlib.sha256(
+        orjson.dumps({"model": "gemini-2.5-flash", "q": query.strip().lower()}, option=orjson.OPT_SORT_KEYS)
+    ).hexdigest()
+    cached = _grounding_cache.get(cache_key)
+    if cached is not None and time.time() - cached[0] < GROUNDING_CACHE_TTL:
+        return cached[1]
+
     try:
         client = get_genai_client()
         if not client:
@@ -1039,11 +1332,11 @@ async def search_with_google_grounding(query: str) -> Dict[str, Any]:
         )
 
         # Make the request with grounding
-        response = client.models.generate_content(
+        response = await _genai_retry(lambda: client.aio.models.generate_content(
             model="gemini-2.5-flash",
             contents=query,
             config=config,
-        )
+        ))
 
         # Check if grounding metadata exists
         grounding_metadata = None
@@ -1074,12 +1367,16 @@ async def search_with_google_grounding(query: str) -> Dict[str, Any]:
                 "sources_count": len(sources)
             }
 
-        return {
+        result = {
             "response": response.text,
             "is_grounded": is_grounded,
             "sources": sources,
-            "grounding_metadata": json.dumps(grounding_metadata) if grounding_metadata else None
+            "grounding_metadata": orjson.dumps(grounding_metadata).decode() if grounding_metadata else None
         }
+        if len(_grounding_cache) >= GROUNDING_CACHE_MAX:
+            _grounding_cache.clear()
+        _grounding_cache[cache_key] = (time.time(), result)
+        return result
 
     except Exception as e:
         logger.error(f"Google AI search error: {e}")
@@ -1096,11 +1393,11 @@ async def search_with_google_grounding(query: str) -> Dict[str, Any]:
                 max_output_tokens=1000,
             )
 
-            response = client.models.generate_content(
+            response = await _genai_retry(lambda: client.aio.models.generate_content(
                 model="gemini-2.5-flash",
                 contents=f"Please provide a helpful response to this query: {query}",
                 config=config,
-            )
+            ))
 
             return {
                 "response": response.text,
@@ -1118,31 +1415,6 @@ async def search_with_google_grounding(query: str) -> Dict[str, Any]:
                 "grounding_metadata": None
             }
 
-def read_progress_file():
-    """Read progress information from file with better error handling"""
-    try:
-        if os.path.exists(PROGRESS_FILE):
-            with open(PROGRESS_FILE, 'r') as f:
-                data = json.load(f)
-                logger.debug(f"Read progress file: {data}")
-                return data
-        else:
-            logger.debug("Progress file does not exist")
-            return None
-    except json.JSONDecodeError as e:
-        logger.error(f"Invalid JSON in progress file: {e}")
-        # Try to remove corrupted file
-        try:
-            os.remove(PROGRESS_FILE)
-            logger.info("Removed corrupted progress file")
-        except:
-            pass
-        return None
-    except Exception as e:
-        logger.error(f"Failed to read progress file: {e}")
-        return None
-
-
 # Also add this helper function to check actual process status
 def check_actual_process_status():
     """Check if scraping process is actually running"""
@@ -1151,21 +1423,19 @@ def check_actual_process_status():
     try:
         # Check if process object exists and is alive
         if scraping_process is not None:
-            poll_result = scraping_process.poll()
-            if poll_result is None:
+            if scraping_process.returncode is None:
                 # Process is still running
                 return True
             else:
                 # Process has ended
-                logger.info(f"Scraping process ended with code: {poll_result}")
+                logger.info(f"Scraping process ended with code: {scraping_process.returncode}")
                 scraping_process = None
                 return False
         
-        # Check for progress file
-        if os.path.exists(PROGRESS_FILE):
-            progress_data = read_progress_file()
-            if progress_data and progress_data.get("status") == "running":
-                return True
+        # Check the shared progress region
+        progress_data = read_progress_file()
+        if progress_data and progress_data.get("status") == "running":
+            return True
         
         return False
         
@@ -1178,9 +1448,12 @@ def create_first_admin():
     """Create the first admin user if no users exist"""
     db = SessionLocal()
     try:
-        # Check if any admin users exist
-        admin_count = db.query(User).filter(User.role == "admin").count()
-        if admin_count == 0:
+        # EXISTS-style probe: SQLite stops at the first admin row instead of
+        # counting them all; the bcrypt hash is only paid on first boot
+        has_admin = db.execute(
+            select(User.id).where(User.role == "admin").limit(1)
+        ).first() is not None
+        if not has_admin:
             admin_user = User(
                 username="admin",
                 email="admin@example.com",
@@ -1210,18 +1483,6 @@ class AdminUserCreate(BaseModel):
     role: str = "user"
     is_approved: bool = True
 
-class UserOut(BaseModel):
-    id: int
-    username: str
-    email: str
-    role: str
-    is_approved: bool
-    created_at: datetime
-    created_by: Optional[int]
-
-    class Config:
-        from_attributes = True
-
 class UserUpdate(BaseModel):
     role: Optional[str] = None
     is_approved: Optional[bool] = None
@@ -1243,19 +1504,58 @@ class ChatResponse(BaseModel):
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
-    create_first_admin()
+    # Size the default executor for the blocking work we push off the loop
+    # (bcrypt hashing, sqlite calls routed through asyncio.to_thread)
+    asyncio.get_running_loop().set_default_executor(
+        ThreadPoolExecutor(max_workers=int(os.getenv("THREAD_POOL_SIZE", "32")))
+    )
+    # Off the loop: first boot pays a bcrypt hash in create_first_admin
+    await asyncio.to_thread(create_first_admin)
+    # Build the shared GenAI client once so every request reuses its
+    # connection pool
+    app.state.genai = get_genai_client()
+    # Start the grounded-query micro-batcher
+    global _grounded_queue
+    _grounded_queue = asyncio.Queue()
+    batcher = asyncio.create_task(_grounded_batch_worker())
+
+    # Reconcile scraping state left over from a previous run
+    try:
+        if check_actual_process_status():
+            logger.info("Found running scraping process on startup")
+            progress_data = read_progress_file()
+            if progress_data:
+                scraping_status.status = progress_data.get("status", "running")
+                scraping_status.current_step = progress_data.get("current_step")
+                scraping_status.step_name = progress_data.get("step_name")
+                scraping_status.records_processed = progress_data.get("records_processed")
+        else:
+            logger.info("No running scraping process found on startup, resetting to idle")
+            scraping_status.status = "idle"
+            cleanup_progress_file()
+    except Exception as e:
+        logger.error(f"Error during startup cleanup: {e}")
+        scraping_status.status = "idle"
+        cleanup_progress_file()
+
     logger.info("Application started successfully")
     yield
     # Shutdown
+    batcher.cancel()
+    _grounded_queue = None
+    if scraping_process and scraping_process.returncode is None:
+        await stop_scraping_process()
+    cleanup_progress_file()  # Final cleanup on shutdown
     logger.info("Application shutting down")
 
 # FastAPI app instance
-# IMPORTANT: The 'app' instance must be created before any @app.on_event or route decorators.
+# IMPORTANT: The 'app' instance must be created before any route decorators.
 app = FastAPI(
     title="Partners8 Management System",
     description="A comprehensive system with user management, AI chat with data query capabilities, and data scraping",
     version="2.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
     # docs_url=None,s
     redoc_url=None
 )
@@ -1269,52 +1569,27 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# FastAPI event handlers
-@app.on_event("startup")
-async def startup_event():
-    """Initialize scraping tables and cleanup any orphaned processes"""
-    global scraping_status
-    
-    try:
-        # Check if there's actually a running process
-        if check_actual_process_status():
-            logger.info("Found running scraping process on startup")
-            # Read current status from progress file
-            progress_data = read_progress_file()
-            if progress_data:
-                scraping_status.status = progress_data.get("status", "running")
-                scraping_status.current_step = progress_data.get("current_step")
-                scraping_status.step_name = progress_data.get("step_name")
-                scraping_status.records_processed = progress_data.get("records_processed")
-        else:
-            logger.info("No running scraping process found on startup, resetting to idle")
-            scraping_status = ScrapingStatus(status="idle")
-            cleanup_progress_file()
-            
-    except Exception as e:
-        logger.error(f"Error during startup cleanup: {e}")
-        scraping_status = ScrapingStatus(status="idle")
-        cleanup_progress_file()
-
-
-@app.on_event("shutdown")
-async def shutdown_event():
-    """Cleanup scraping processes on shutdown"""
-    global scraping_process
-    if scraping_process and scraping_process.poll() is None:
-        stop_scraping_process()
-    cleanup_progress_file() # Final cleanup on shutdown
-
 # API Endpoints
 
 # Authentication endpoints
 @app.post("/token")
 async def login_for_access_token(
     form_data: OAuth2PasswordRequestForm = Depends(),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.username == form_data.username).first()
-    if not user or not verify_password(form_data.password, user.password_hash):
+    # Indexed point lookup projecting only the columns login needs; no ORM
+    # hydration on the auth-heavy path
+    user = (await db.execute(
+        select(User.id, User.username, User.email, User.role,
+               User.is_approved, User.password_hash)
+        .where(User.username == form_data.username)
+        .limit(1)
+    )).first()
+    password_ok = await averify_password(
+        form_data.password,
+        user.password_hash if user else _DUMMY_PASSWORD_HASH,
+    )
+    if not user or not password_ok:
         raise HTTPException(
             status_code=401,
             detail="Incorrect username or password",
@@ -1339,17 +1614,11 @@ async def login_for_access_token(
     }
 
 @app.post("/signup")
-async def signup(user: UserCreate, db: Session = Depends(get_db)):
-    # Check if user already exists
-    existing_user = db.query(User).filter(
-        (User.username == user.username) | (User.email == user.email)
-    ).first()
-
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username or email already registered")
-
-    # Create new user
-    hashed_password = get_password_hash(user.password)
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_db)):
+    # Insert directly and let the unique indexes on username/email reject
+    # duplicates: one round-trip instead of a SELECT+INSERT, and no race
+    # window between the check and the write
+    hashed_password = await aget_password_hash(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
@@ -1359,8 +1628,12 @@ async def signup(user: UserCreate, db: Session = Depends(get_db)):
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    await db.refresh(new_user)
 
     return {"message": "User created successfully. Awaiting admin approval."}
 
@@ -1382,16 +1655,9 @@ async def verify_token(current_user: User = Depends(get_current_user)):
 async def create_user(
     user: AdminUserCreate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    existing_user = db.query(User).filter(
-        (User.username == user.username) | (User.email == user.email)
-    ).first()
-
-    if existing_user:
-        raise HTTPException(status_code=400, detail="Username or email already registered")
-
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await aget_password_hash(user.password)
     new_user = User(
         username=user.username,
         email=user.email,
@@ -1402,32 +1668,55 @@ async def create_user(
     )
 
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="Username or email already registered")
+    await db.refresh(new_user)
 
     return {"message": "User created successfully", "user_id": new_user.id}
 
 @app.get("/users", response_model=dict)
 async def get_users(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_db),
     page: int = 1,
     limit: int = 10
 ):
     """Get paginated list of users"""
     offset = (page - 1) * limit
-    total_users = db.query(User).count()
-    users = db.query(User).offset(offset).limit(limit).all()
-    return {"total": total_users, "page": page, "limit": limit, "users": [UserOut.from_orm(user) for user in users]}
+    # One round-trip: the window function carries the total alongside each
+    # page row, and projecting only the public user columns skips ORM hydration
+    # (and never pulls password_hash off disk)
+    rows = (await db.execute(
+        select(
+            User.id, User.username, User.email, User.role,
+            User.is_approved, User.created_at, User.created_by,
+            func.count().over().label("total"),
+        ).offset(offset).limit(limit)
+    )).all()
+    total_users = rows[0].total if rows else await db.scalar(select(func.count()).select_from(User))
+    return {
+        "total": total_users,
+        "page": page,
+        "limit": limit,
+        # Plain dicts straight to ORJSONResponse: the projection already
+        # matches the public shape, so re-validating each row buys nothing
+        "users": [
+            {key: value for key, value in row._mapping.items() if key != "total"}
+            for row in rows
+        ],
+    }
 
 @app.put("/users/{user_id}")
 async def update_user(
     user_id: int,
     user_update: UserUpdate,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -1442,7 +1731,7 @@ async def update_user(
     except:
         pass  # Column doesn't exist in older schema
 
-    db.commit()
+    await db.commit()
 
     return {"message": "User updated successfully"}
 
@@ -1450,9 +1739,9 @@ async def update_user(
 async def approve_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -1461,7 +1750,7 @@ async def approve_user(
         user.updated_at = datetime.utcnow()
     except:
         pass  # Column doesn't exist in older schema
-    db.commit()
+    await db.commit()
 
     return {"message": "User approved successfully"}
 
@@ -1469,9 +1758,9 @@ async def approve_user(
 async def promote_to_admin(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    user = db.query(User).filter(User.id == user_id).first()
+    user = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
@@ -1480,7 +1769,7 @@ async def promote_to_admin(
         user.updated_at = datetime.utcnow()
     except:
         pass  # Column doesn't exist in older schema
-    db.commit()
+    await db.commit()
 
     return {"message": f"User {user.username} promoted to admin successfully"}
 
@@ -1489,35 +1778,46 @@ async def promote_to_admin(
 async def chat(
     request: ChatRequest,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     try:
         # Get or create chat session
         if request.session_id:
-            session = db.query(ChatSession).filter(
+            session = (await db.execute(select(ChatSession).where(
                 ChatSession.session_id == request.session_id,
                 ChatSession.user_id == current_user.id
-            ).first()
+            ))).scalars().first()
         else:
             session = None
 
         if not session:
             session = ChatSession(user_id=current_user.id)
             db.add(session)
-            db.commit()
-            db.refresh(session)
+            await bump_user_stats(db, current_user.id, sessions=1)
+            await db.commit()
+            await db.refresh(session)
 
         # Determine query type and route accordingly
         if is_data_query(request.message):
             # Handle as data query
             query_type = "data_query"
+            # Speculatively start the grounded search in parallel: if any SQL
+            # stage fails the fallback answer is already in flight, and if
+            # SQL succeeds the task is just cancelled
+            grounded_task = asyncio.create_task(search_with_google_grounding(request.message))
             sql_result = await natural_language_to_sql(request.message)
 
             if sql_result["success"]:
-                # Execute the SQL query
-                execution_result = await execute_sql_query(sql_result["sql_query"])
+                # Join the execution started mid-stream, or run it now
+                execution_task = sql_result.get("execution_task")
+                if execution_task is not None:
+                    execution_result = await execution_task
+                else:
+                    execution_result = await execute_sql_query(sql_result["sql_query"])
 
                 if execution_result["success"]:
+                    grounded_task.cancel()  # SQL path won; drop the speculative call
+
                     # Generate summary of results
                     summary = await summarize_query_results(
                         request.message,
@@ -1537,14 +1837,11 @@ async def chat(
                             for i, result in enumerate(execution_result["results"][:sample_count]):
                                 response_text += f"\n{i+1}. "
                                 # Format key fields nicely
-                                key_fields = ['ZipCode','RegionName', 'State', 'ZMediumRent', 'ZMediumValue', 'IncomeLimits']
-                                displayed_fields = []
-                                for field in key_fields:
-                                    if field in result and result[field] is not None:
-                                        value = result[field]
-                                        if isinstance(value, (int, float)) and field != 'State':
-                                            value = f"${value:,.0f}" if value > 1000 else str(value)
-                                        displayed_fields.append(f"{field}: {value}")
+                                displayed_fields = [
+                                    f"{field}: {SAMPLE_FIELD_FORMATTERS[field](result[field])}"
+                                    for field in SAMPLE_KEY_FIELDS
+                                    if result.get(field) is not None
+                                ]
                                 response_text += ", ".join(displayed_fields[:3])
 
                     # Save chat message with SQL data
@@ -1555,11 +1852,12 @@ async def chat(
                         is_grounded=False,
                         grounding_metadata=None,
                         sql_query=sql_result["sql_query"],
-                        query_results=json.dumps(execution_result["results"]),
+                        query_results=encode_query_results(execution_result["results"]),
                         query_type=query_type
                     )
                     db.add(chat_message)
-                    db.commit()
+                    await bump_user_stats(db, current_user.id, messages=1, data_queries=1)
+                    await db.commit()
 
                     return ChatResponse(
                         response=response_text,
@@ -1571,19 +1869,19 @@ async def chat(
                         query_results=execution_result["results"]
                     )
                 else:
-                    # SQL execution failed, fall back to grounded search
-                    grounded_result = await search_with_google_grounding(request.message)
+                    # SQL execution failed, fall back to the in-flight grounded search
+                    grounded_result = await grounded_task
                     response_text = f"I couldn't query the database directly (SQL error), but here's what I found online:\n\n{grounded_result['response']}"
                     query_type = "grounded_fallback"
             else:
-                # SQL generation failed, fall back to grounded search
-                grounded_result = await search_with_google_grounding(request.message)
+                # SQL generation failed, fall back to the in-flight grounded search
+                grounded_result = await grounded_task
                 response_text = f"I couldn't generate a database query for that question, but here's what I found online:\n\n{grounded_result['response']}"
                 query_type = "grounded_fallback"
         else:
             # Handle as general query with grounding
             query_type = "grounded"
-            grounded_result = await search_with_google_grounding(request.message)
+            grounded_result = await grounded_search_batched(request.message)
             response_text = grounded_result["response"]
 
         # For non-data queries or fallback cases
@@ -1600,7 +1898,9 @@ async def chat(
                 query_type=query_type
             )
             db.add(chat_message)
-            db.commit()
+            await bump_user_stats(db, current_user.id, messages=1,
+                                  grounded=int(grounded_result["is_grounded"]))
+            await db.commit()
 
             return ChatResponse(
                 response=response_text,
@@ -1615,7 +1915,7 @@ async def chat(
         # Update session timestamp
         try:
             session.updated_at = datetime.utcnow()
-            db.commit()
+            await db.commit()
         except Exception as e:
             logger.error(f"Error updating session timestamp: {e}")
             pass  # Column doesn't exist in older schema
@@ -1624,6 +1924,153 @@ async def chat(
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail="Internal server error during chat processing")
 
+
+@app.post("/chat/stream")
+async def chat_stream(
+    request: ChatRequest,
+    current_user: User = Depends(get_current_user),
+    db: AsyncSession = Depends(get_db)
+):
+    """Streamed variant of /chat: Server-Sent Events with token deltas
+
+    Tokens are forwarded to the client as Gemini produces them, so rendering
+    overlaps generation instead of waiting for the full response; the chat
+    message is persisted once the stream closes.
+    """
+    # Get or create chat session (same logic as /chat)
+    if request.session_id:
+        session = (await db.execute(select(ChatSession).where(
+            ChatSession.session_id == request.session_id,
+            ChatSession.user_id == current_user.id
+        ))).scalars().first()
+    else:
+        session = None
+
+    if not session:
+        session = ChatSession(user_id=current_user.id)
+        db.add(session)
+        await bump_user_stats(db, current_user.id, sessions=1)
+        await db.commit()
+        await db.refresh(session)
+
+    session_db_id = session.id
+    session_public_id = session.session_id
+
+    def sse(payload: dict) -> bytes:
+        return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+    async def event_stream():
+        accumulated = []
+        query_type = "grounded"
+        sql_query = None
+        stored_results = None
+        is_grounded = False
+
+        try:
+            client = get_genai_client()
+            if not client:
+                yield sse({"error": "AI client unavailable"})
+                return
+
+            use_grounded = True
+            if is_data_query(request.message):
+                sql_result = await natural_language_to_sql(request.message)
+                if sql_result.get("success"):
+                    execution_task = sql_result.get("execution_task")
+                    if execution_task is not None:
+                        execution_result = await execution_task
+                    else:
+                        execution_result = await execute_sql_query(sql_result["sql_query"])
+
+                    if execution_result["success"]:
+                        use_grounded = False
+                        query_type = "data_query"
+                        sql_query = sql_result["sql_query"]
+                        results = execution_result["results"]
+                        stored_results = encode_query_results(results)
+
+                        header = "**Data Analysis Results:**\n\n"
+                        accumulated.append(header)
+                        yield sse({"delta": header})
+
+                        if results:
+                            config = types.GenerateContentConfig(
+                                temperature=0.3,
+                                max_output_tokens=300,
+                            )
+                            async for chunk in await client.aio.models.generate_content_stream(
+                                model="gemini-2.5-flash",
+                                contents=_summary_prompt(request.message, sql_query, results),
+                                config=config,
+                            ):
+                                if chunk.text:
+                                    accumulated.append(chunk.text)
+                                    yield sse({"delta": chunk.text})
+
+                            footer = f"\n\n**Found {execution_result['row_count']} records matching your query.**"
+                        else:
+                            footer = "No results found for your query."
+                        accumulated.append(footer)
+                        yield sse({"delta": footer})
+                    else:
+                        query_type = "grounded_fallback"
+                else:
+                    query_type = "grounded_fallback"
+
+            if use_grounded:
+                if query_type == "grounded_fallback":
+                    preamble = "I couldn't query the database directly, but here's what I found online:\n\n"
+                    accumulated.append(preamble)
+                    yield sse({"delta": preamble})
+
+                config = types.GenerateContentConfig(
+                    tools=[types.Tool(google_search=types.GoogleSearch())],
+                    temperature=0.7,
+                    max_output_tokens=1000,
+                )
+                async for chunk in await client.aio.models.generate_content_stream(
+                    model="gemini-2.5-flash",
+                    contents=request.message,
+                    config=config,
+                ):
+                    if chunk.text:
+                        accumulated.append(chunk.text)
+                        yield sse({"delta": chunk.text})
+                is_grounded = True
+
+            yield sse({"done": True, "session_id": session_public_id, "query_type": query_type})
+
+        except Exception as e:
+            logger.error(f"Chat stream error: {e}")
+            yield sse({"error": "Internal server error during chat processing"})
+        finally:
+            # Persist after the stream closes, on a fresh session: the
+            # request-scoped one may already be torn down by then
+            if accumulated:
+                try:
+                    async with AsyncSessionLocal() as store_db:
+                        store_db.add(ChatMessage(
+                            session_id=session_db_id,
+                            message=request.message,
+                            response="".join(accumulated),
+                            is_grounded=is_grounded,
+                            grounding_metadata=None,
+                            sql_query=sql_query,
+                            query_results=stored_results,
+                            query_type=query_type,
+                        ))
+                        await bump_user_stats(
+                            store_db, current_user.id, messages=1,
+                            grounded=int(is_grounded),
+                            data_queries=int(query_type == "data_query"),
+                        )
+                        await store_db.commit()
+                except Exception as e:
+                    logger.error(f"Error persisting streamed chat message: {e}")
+
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
+
 # Scraping endpoints
 # 7. Enhanced get_scraping_status endpoint
 
@@ -1631,12 +2078,12 @@ async def chat(
 async def delete_user(
     user_id: int,
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a user account (Admin only)"""
     try:
         # Find the user to delete
-        user_to_delete = db.query(User).filter(User.id == user_id).first()
+        user_to_delete = (await db.execute(select(User).where(User.id == user_id))).scalars().first()
         if not user_to_delete:
             raise HTTPException(status_code=404, detail="User not found")
 
@@ -1654,7 +2101,9 @@ async def delete_user(
 
         # 3. Prevent deletion of the last admin/super_admin
         if user_to_delete.role in ["admin", "super_admin"]:
-            admin_count = db.query(User).filter(User.role.in_(["admin", "super_admin"])).count()
+            admin_count = await db.scalar(
+                select(func.count()).select_from(User).where(User.role.in_(["admin", "super_admin"]))
+            )
             if admin_count <= 1:
                 raise HTTPException(
                     status_code=400, 
@@ -1666,30 +2115,33 @@ async def delete_user(
         deleted_role = user_to_delete.role
 
         # Delete related data first (if any)
-        # Delete chat sessions and messages
+        # Two bulk DELETEs instead of loading sessions and deleting each one:
+        # messages via a subquery over the user's session ids, then the sessions
         try:
-            chat_sessions = db.query(ChatSession).filter(ChatSession.user_id == user_id).all()
-            for session in chat_sessions:
-                # Delete messages in this session
-                db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
-                # Delete the session
-                db.delete(session)
-            
-            logger.info(f"Deleted {len(chat_sessions)} chat sessions for user {deleted_username}")
+            session_ids = select(ChatSession.id).where(ChatSession.user_id == user_id)
+            await db.execute(sql_delete(ChatMessage).where(ChatMessage.session_id.in_(session_ids)))
+            sessions_deleted = (await db.execute(
+                sql_delete(ChatSession).where(ChatSession.user_id == user_id)
+            )).rowcount
+            await db.execute(sql_delete(UserStats).where(UserStats.user_id == user_id))
+
+            logger.info(f"Deleted {sessions_deleted} chat sessions for user {deleted_username}")
         except Exception as e:
             logger.warning(f"Error deleting chat data for user {user_id}: {e}")
             # Continue with user deletion even if chat cleanup fails
 
         # Delete scraping logs started by this user (optional - you might want to keep these for auditing)
         try:
-            scraping_logs_deleted = db.query(ScrapingLog).filter(ScrapingLog.started_by == user_id).delete()
+            scraping_logs_deleted = (await db.execute(
+                sql_delete(ScrapingLog).where(ScrapingLog.started_by == user_id)
+            )).rowcount
             logger.info(f"Deleted {scraping_logs_deleted} scraping logs for user {deleted_username}")
         except Exception as e:
             logger.warning(f"Error deleting scraping logs for user {user_id}: {e}")
 
         # Delete the user
-        db.delete(user_to_delete)
-        db.commit()
+        await db.delete(user_to_delete)
+        await db.commit()
 
         logger.info(f"Admin {current_user.username} deleted user {deleted_username} (role: {deleted_role})")
 
@@ -1707,7 +2159,7 @@ async def delete_user(
         raise
     except Exception as e:
         logger.error(f"Error deleting user {user_id}: {e}")
-        db.rollback()
+        await db.rollback()
         raise HTTPException(status_code=500, detail=f"Failed to delete user: {str(e)}")
     
 
@@ -1715,7 +2167,7 @@ async def delete_user(
 @app.get("/admin/deletion_audit")
 async def get_deletion_audit(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get audit log of deleted users (from application logs)"""
     # Since we're logging deletions, you could read from log files
@@ -1729,13 +2181,25 @@ async def get_deletion_audit(
 
 
 @app.get("/scraping_status")
-async def get_scraping_status(current_user: dict = Depends(get_current_user)):
+async def get_scraping_status(
+    request: Request,
+    response: Response,
+    current_user: dict = Depends(get_current_user)
+):
     """Get current scraping status with progress information"""
     global scraping_status
-    
+
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
 
+    # The UI polls this every second or two; when nothing changed since the
+    # client's last poll, answer 304 from the write counter alone
+    version = progress_version()
+    etag = f'W/"{version}"'
+    if version and request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers={"ETag": etag})
+    response.headers["ETag"] = etag
+
     try:
         # ALWAYS read from progress file first to get the most current status
         progress_data = read_progress_file()
@@ -1769,8 +2233,8 @@ async def get_scraping_status(current_user: dict = Depends(get_current_user)):
 
         return {
             "status": scraping_status.status,
-            "started_at": scraping_status.started_at.isoformat() if scraping_status.started_at else None,
-            "completed_at": scraping_status.completed_at.isoformat() if scraping_status.completed_at else None,
+            "started_at": scraping_status.started_at,
+            "completed_at": scraping_status.completed_at,
             "records_processed": scraping_status.records_processed,
             "error_message": scraping_status.error_message,
             "current_step": scraping_status.current_step,
@@ -1793,7 +2257,46 @@ async def get_scraping_status(current_user: dict = Depends(get_current_user)):
             "step_name": None,
             "progress_percentage": None
         }
-    
+
+@app.get("/scraping_status/stream")
+async def stream_scraping_status(
+    current_user: dict = Depends(get_current_user)
+):
+    """Push scraping progress over SSE instead of per-second client polling
+
+    An event is emitted whenever the shared progress region's write counter
+    moves; between updates the generator only does a nanosecond memory read
+    every 200ms, so idle viewers cost nothing. /scraping_status remains for
+    clients without EventSource support.
+    """
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    def sse(payload) -> bytes:
+        return b"data: " + orjson.dumps(payload) + b"\n\n"
+
+    async def event_stream():
+        last_version = None
+        last_emit = time.monotonic()
+        while True:
+            version = progress_version()
+            if version != last_version:
+                last_version = version
+                payload = read_progress_file() or {"status": scraping_status.status}
+                yield sse(payload)
+                last_emit = time.monotonic()
+            elif time.monotonic() - last_emit > 15:
+                # Comment frame keeps proxies from timing out the stream
+                yield b": keep-alive\n\n"
+                last_emit = time.monotonic()
+            await asyncio.sleep(0.2)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"},
+    )
+
 @app.get("/scraping_logs")
 async def get_scraping_logs(
     current_user: dict = Depends(get_current_user),
@@ -1805,40 +2308,37 @@ async def get_scraping_logs(
         raise HTTPException(status_code=403, detail="Admin access required")
 
     try:
-        conn = sqlite3.connect("partners8_data.db")
-        cursor = conn.cursor()
-
-        offset = (page - 1) * limit
+        with db_pool.acquire() as conn:
+            cursor = conn.cursor()
+            cursor.row_factory = sqlite3.Row
 
-        # Get total count
-        cursor.execute("SELECT COUNT(*) FROM scraping_logs")
-        total_logs = cursor.fetchone()[0]
+            offset = (page - 1) * limit
 
-        cursor.execute('''
-            SELECT id, status, started_by, started_at, completed_at, error_message, records_processed,
-                   current_step, total_steps, step_name, progress_percentage
-            FROM scraping_logs
-            ORDER BY started_at DESC
-            LIMIT ? OFFSET ?
-        ''', (limit, offset))
-
-        logs = []
-        for row in cursor.fetchall():
-            log = {
-                "id": row[0],
-                "status": row[1],
-                "started_by": row[2],
-                "started_at": row[3],
-                "completed_at": row[4],
-                "error_message": row[5],
-                "records_processed": row[6] or 0,
-                "current_step": row[7],
-                "total_steps": row[8],
-                "step_name": row[9],
-                "progress_percentage": row[10]
-            }
-            logs.append(log)
-        conn.close()
+            # Single round-trip: the window function carries the total with
+            # every page row, and sqlite3.Row lets dict() build each log at
+            # C level instead of index-by-index
+            cursor.execute('''
+                SELECT id, status, started_by, started_at, completed_at, error_message,
+                       COALESCE(records_processed, 0) AS records_processed,
+                       current_step, total_steps, step_name, progress_percentage,
+                       COUNT(*) OVER() AS total
+                FROM scraping_logs
+                ORDER BY started_at DESC
+                LIMIT ? OFFSET ?
+            ''', (limit, offset))
+            rows = cursor.fetchall()
+
+            if rows:
+                total_logs = rows[0]["total"]
+            else:
+                cursor.execute("SELECT COUNT(*) FROM scraping_logs")
+                total_logs = cursor.fetchone()[0]
+
+            logs = []
+            for row in rows:
+                log = dict(row)
+                del log["total"]
+                logs.append(log)
         return {"total": total_logs, "page": page, "limit": limit, "logs": logs}
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Database error: {str(e)}")
@@ -1846,7 +2346,7 @@ async def get_scraping_logs(
 @app.post("/start_scraping")
 async def start_scraping(current_user: dict = Depends(get_current_user)):
     """Start the scraping process"""
-    global scraping_thread, scraping_status
+    global scraping_task, scraping_status
 
     if current_user.role != "admin":
         raise HTTPException(status_code=403, detail="Admin access required")
@@ -1859,9 +2359,8 @@ async def start_scraping(current_user: dict = Depends(get_current_user)):
         # Log the start
         log_scraping_operation(current_user.id, "started")
 
-        # Start scraping in a separate thread
-        scraping_thread = threading.Thread(target=run_scraping_script, args=(current_user.id,), daemon=True)
-        scraping_thread.start()
+        # Supervise scraping as an event-loop task; no dedicated thread needed
+        scraping_task = asyncio.create_task(run_scraping_script(current_user.id))
 
         return {"message": "Scraping started successfully", "status": "running"}
 
@@ -1879,7 +2378,7 @@ async def stop_scraping(current_user: dict = Depends(get_current_user)):
 
     # Don't check if running - just try to stop
     try:
-        stop_scraping_process()
+        await stop_scraping_process()
         log_scraping_operation(
             current_user.id,
             "stopped",
@@ -1891,60 +2390,52 @@ async def stop_scraping(current_user: dict = Depends(get_current_user)):
     except Exception as e:
         logger.error(f"❌ Stop error: {e}")
         return {"message": "Stop attempted", "status": "stopped"}  # Return success anyway
-# Removed pause_scraping and resume_scraping as control is now via progress file in scrape.py
-# @app.post("/pause_scraping")
-# async def pause_scraping(current_user: dict = Depends(get_current_user)):
-#     """Pause the scraping process"""
-#     global scraping_process
-
-#     if current_user.role != "admin":
-#         raise HTTPException(status_code=403, detail="Admin access required")
-
-#     if scraping_status.status != "running":
-#         raise HTTPException(status_code=400, detail="No scraping process is currently running")
-
-#     try:
-#         if scraping_process and scraping_process.poll() is None:
-#             # Send pause command
-#             scraping_process.stdin.write('p\n')
-#             scraping_process.stdin.flush()
-#             return {"message": "Pause signal sent successfully"}
-#         else:
-#             raise HTTPException(status_code=400, detail="No active scraping process found")
-
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Failed to pause scraping: {str(e)}")
-
-# @app.post("/resume_scraping")
-# async def resume_scraping(current_user: dict = Depends(get_current_user)):
-#     """Resume the scraping process"""
-#     global scraping_process
-
-#     if current_user.role != "admin":
-#         raise HTTPException(status_code=403, detail="Admin access required")
-
-#     try:
-#         if scraping_process and scraping_process.poll() is None:
-#             # Send resume command
-#             scraping_process.stdin.write('r\n')
-#             scraping_process.stdin.flush()
-#             return {"message": "Resume signal sent successfully"}
-#         else:
-#             raise HTTPException(status_code=400, detail="No active scraping process found")
-
-#     except Exception as e:
-#         raise HTTPException(status_code=500, detail=f"Failed to resume scraping: {str(e)}")
+@app.post("/pause_scraping")
+async def pause_scraping(current_user: dict = Depends(get_current_user)):
+    """Pause the scraping process via SIGUSR1"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    if scraping_process is None or scraping_process.returncode is not None:
+        raise HTTPException(status_code=400, detail="No active scraping process found")
+
+    try:
+        os.kill(scraping_process.pid, signal.SIGUSR1)
+        return {"message": "Pause signal sent successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to pause scraping: {str(e)}")
+
+@app.post("/resume_scraping")
+async def resume_scraping(current_user: dict = Depends(get_current_user)):
+    """Resume a paused scraping process via SIGUSR2"""
+    if current_user.role != "admin":
+        raise HTTPException(status_code=403, detail="Admin access required")
+
+    if scraping_process is None or scraping_process.returncode is not None:
+        raise HTTPException(status_code=400, detail="No active scraping process found")
+
+    try:
+        os.kill(scraping_process.pid, signal.SIGUSR2)
+        return {"message": "Resume signal sent successfully"}
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to resume scraping: {str(e)}")
 
 
 @app.get("/chat_sessions")
 async def get_chat_sessions(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get all chat sessions for the current user"""
-    sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).order_by(ChatSession.updated_at.desc()).all()
+    # One LEFT JOIN + GROUP BY round-trip instead of loading every message
+    # just to count them
+    rows = (await db.execute(
+        select(ChatSession, func.count(ChatMessage.id).label("message_count"))
+        .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+        .where(ChatSession.user_id == current_user.id)
+        .group_by(ChatSession.id)
+        .order_by(ChatSession.updated_at.desc())
+    )).all()
 
     return [
         {
@@ -1952,29 +2443,41 @@ async def get_chat_sessions(
             "session_id": session.session_id,
             "created_at": session.created_at,
             "updated_at": session.updated_at,
-            "message_count": len(session.messages)
+            "message_count": message_count
         }
-        for session in sessions
+        for session, message_count in rows
     ]
 
 @app.get("/chat_sessions/{session_id}/messages")
 async def get_session_messages(
     session_id: str,
+    limit: int = 50,
+    before_id: Optional[int] = None,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
-    """Get all messages for a specific chat session"""
-    session = db.query(ChatSession).filter(
+    """Get messages for a specific chat session (newest page first via keyset)
+
+    Returns up to `limit` messages in chronological order; pass the lowest
+    returned id as `before_id` to page further back through long chats.
+    """
+    session = (await db.execute(select(ChatSession).where(
         ChatSession.session_id == session_id,
         ChatSession.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
-    messages = db.query(ChatMessage).filter(
-        ChatMessage.session_id == session.id
-    ).order_by(ChatMessage.created_at.asc()).all()
+    limit = max(1, min(limit, 200))
+    stmt = select(ChatMessage).where(ChatMessage.session_id == session.id)
+    if before_id is not None:
+        stmt = stmt.where(ChatMessage.id < before_id)
+    # Keyset: grab the newest page, then flip it back to chronological order
+    messages = (await db.execute(
+        stmt.order_by(ChatMessage.id.desc()).limit(limit)
+    )).scalars().all()
+    messages.reverse()
 
     formatted_messages = []
     for msg in messages:
@@ -1993,7 +2496,7 @@ async def get_session_messages(
             message_data["sql_query"] = msg.sql_query
         if msg.query_results:
             try:
-                message_data["query_results"] = json.loads(msg.query_results)
+                message_data["query_results"] = decode_query_results(msg.query_results)
             except Exception as e:
                 logger.error(f"Error parsing query results JSON: {e}")
                 message_data["query_results"] = None
@@ -2006,23 +2509,34 @@ async def get_session_messages(
 async def delete_chat_session(
     session_id: str,
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Delete a chat session and all its messages"""
-    session = db.query(ChatSession).filter(
+    session = (await db.execute(select(ChatSession).where(
         ChatSession.session_id == session_id,
         ChatSession.user_id == current_user.id
-    ).first()
+    ))).scalars().first()
 
     if not session:
         raise HTTPException(status_code=404, detail="Chat session not found")
 
+    # Tally what is about to disappear so the denormalized counters stay true
+    msg_total, msg_grounded, msg_data = (await db.execute(
+        select(
+            func.count(ChatMessage.id),
+            func.sum(case((ChatMessage.is_grounded == True, 1), else_=0)),
+            func.sum(case((ChatMessage.query_type == "data_query", 1), else_=0)),
+        ).where(ChatMessage.session_id == session.id)
+    )).one()
+
     # Delete all messages in the session
-    db.query(ChatMessage).filter(ChatMessage.session_id == session.id).delete()
+    await db.execute(sql_delete(ChatMessage).where(ChatMessage.session_id == session.id))
 
     # Delete the session
-    db.delete(session)
-    db.commit()
+    await db.delete(session)
+    await bump_user_stats(db, current_user.id, sessions=-1, messages=-msg_total,
+                          grounded=-(msg_grounded or 0), data_queries=-(msg_data or 0))
+    await db.commit()
 
     return {"message": "Chat session deleted successfully"}
 
@@ -2065,22 +2579,42 @@ async def get_database_info(
 @app.get("/dashboard/stats")
 async def get_dashboard_stats(
     current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get dashboard statistics for admin users"""
-    total_users = db.query(User).count()
-    approved_users = db.query(User).filter(User.is_approved == True).count()
-    pending_users = db.query(User).filter(User.is_approved == False).count()
-    admin_users = db.query(User).filter(User.role == "admin").count()
-
-    total_chat_sessions = db.query(ChatSession).count()
-    total_messages = db.query(ChatMessage).count()
-    grounded_messages = db.query(ChatMessage).filter(ChatMessage.is_grounded == True).count()
-    data_queries = db.query(ChatMessage).filter(ChatMessage.query_type == "data_query").count()
+    # Conditional aggregates: one scan of users and one of chat_messages
+    # instead of eight separate COUNT(*) round-trips
+    total_users, approved_users, pending_users, admin_users = (await db.execute(
+        select(
+            func.count(User.id),
+            func.sum(case((User.is_approved == True, 1), else_=0)),
+            func.sum(case((User.is_approved == False, 1), else_=0)),
+            func.sum(case((User.role == "admin", 1), else_=0)),
+        )
+    )).one()
 
-    recent_scraping_logs = db.query(ScrapingLog).order_by(
-        ScrapingLog.started_at.desc()
-    ).limit(5).all()
+    total_messages, grounded_messages, data_queries = (await db.execute(
+        select(
+            func.count(ChatMessage.id),
+            func.sum(case((ChatMessage.is_grounded == True, 1), else_=0)),
+            func.sum(case((ChatMessage.query_type == "data_query", 1), else_=0)),
+        )
+    )).one()
+    grounded_messages = grounded_messages or 0
+    data_queries = data_queries or 0
+
+    total_chat_sessions = await db.scalar(select(func.count()).select_from(ChatSession))
+
+    # Project just the displayed columns (skips started_by and the potentially
+    # large error_message text) instead of hydrating full ORM rows
+    recent_scraping_logs = (await db.execute(
+        select(
+            ScrapingLog.id, ScrapingLog.status, ScrapingLog.started_at,
+            ScrapingLog.completed_at, ScrapingLog.records_processed,
+            ScrapingLog.current_step, ScrapingLog.total_steps,
+            ScrapingLog.step_name, ScrapingLog.progress_percentage,
+        ).order_by(ScrapingLog.started_at.desc()).limit(5)
+    )).all()
 
     # Database info
     schema_data = get_database_schema()
@@ -2104,49 +2638,50 @@ async def get_dashboard_stats(
             "available": schema_data is not None,
             "total_rows": database_rows
         },
-        "recent_scraping": [
-            {
-                "id": log.id,
-                "status": log.status,
-                "started_at": log.started_at.isoformat() if log.started_at else None,
-                "completed_at": log.completed_at.isoformat() if log.completed_at else None,
-                "records_processed": log.records_processed,
-                "current_step": log.current_step,
-                "total_steps": log.total_steps,
-                "step_name": log.step_name,
-                "progress_percentage": log.progress_percentage
-            }
-            for log in recent_scraping_logs
-        ]
+        "recent_scraping": [dict(row._mapping) for row in recent_scraping_logs]
     }
 
 @app.get("/dashboard/user_stats")
 async def get_user_dashboard_stats(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_db)
 ):
     """Get dashboard statistics for regular users"""
-    user_sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).count()
-
-    user_messages = db.query(ChatMessage).join(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).count()
-
-    user_grounded_messages = db.query(ChatMessage).join(ChatSession).filter(
-        ChatSession.user_id == current_user.id,
-        ChatMessage.is_grounded == True
-    ).count()
-
-    user_data_queries = db.query(ChatMessage).join(ChatSession).filter(
-        ChatSession.user_id == current_user.id,
-        ChatMessage.query_type == "data_query"
-    ).count()
-
-    recent_sessions = db.query(ChatSession).filter(
-        ChatSession.user_id == current_user.id
-    ).order_by(ChatSession.updated_at.desc()).limit(5).all()
+    stats = await db.get(UserStats, current_user.id)
+    if stats is not None:
+        user_sessions = stats.sessions_count
+        user_messages = stats.messages_count
+        user_grounded_messages = stats.grounded_count
+        user_data_queries = stats.data_query_count
+    else:
+        # Account predates the counters table: aggregate once, then seed the
+        # row so every later visit is a single primary-key fetch
+        user_sessions, user_messages, user_grounded_messages, user_data_queries = (await db.execute(
+            select(
+                func.count(func.distinct(ChatSession.id)),
+                func.count(ChatMessage.id),
+                func.sum(case((ChatMessage.is_grounded == True, 1), else_=0)),
+                func.sum(case((ChatMessage.query_type == "data_query", 1), else_=0)),
+            )
+            .select_from(ChatSession)
+            .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+            .where(ChatSession.user_id == current_user.id)
+        )).one()
+        user_grounded_messages = user_grounded_messages or 0
+        user_data_queries = user_data_queries or 0
+        await bump_user_stats(db, current_user.id, sessions=user_sessions,
+                              messages=user_messages, grounded=user_grounded_messages,
+                              data_queries=user_data_queries)
+        await db.commit()
+
+    recent_sessions = (await db.execute(
+        select(ChatSession, func.count(ChatMessage.id).label("message_count"))
+        .outerjoin(ChatMessage, ChatMessage.session_id == ChatSession.id)
+        .where(ChatSession.user_id == current_user.id)
+        .group_by(ChatSession.id)
+        .order_by(ChatSession.updated_at.desc())
+        .limit(5)
+    )).all()
 
     # Database info
     schema_data = get_database_schema()
@@ -2168,9 +2703,9 @@ async def get_user_dashboard_stats(
                 "session_id": session.session_id,
                 "created_at": session.created_at,
                 "updated_at": session.updated_at,
-                "message_count": len(session.messages)
+                "message_count": message_count
             }
-            for session in recent_sessions
+            for session, message_count in recent_sessions
         ]
     }
 
@@ -2178,28 +2713,35 @@ async def get_user_dashboard_stats(
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    try:
-        # Test database connection
-        db = SessionLocal()
-        db.execute(text("SELECT 1")) # Use text() for literal SQL
-        db.close()
-        db_status = "healthy"
-    except Exception as e:
-        db_status = f"unhealthy: {str(e)}"
+    async def check_db():
+        # Ping through the pooled async engine instead of opening a session
+        try:
+            async with async_engine.connect() as conn:
+                await conn.execute(text("SELECT 1"))
+            return "healthy"
+        except Exception as e:
+            return f"unhealthy: {str(e)}"
 
-    try:
-        # Test Google AI client
-        client = get_genai_client()
-        ai_status = "healthy" if client else "unhealthy: client initialization failed"
-    except Exception as e:
-        ai_status = f"unhealthy: {str(e)}"
+    async def check_ai():
+        # get_genai_client() is a memoized singleton, so this never re-hits
+        # Google on repeated load-balancer probes
+        try:
+            client = get_genai_client()
+            return "healthy" if client else "unhealthy: client initialization failed"
+        except Exception as e:
+            return f"unhealthy: {str(e)}"
 
-    try:
-        # Test data database
-        schema_data = get_database_schema()
-        data_db_status = "healthy" if schema_data else "unavailable: no data table found"
-    except Exception as e:
-        data_db_status = f"unhealthy: {str(e)}"
+    async def check_data():
+        try:
+            schema_data = await asyncio.to_thread(get_database_schema)
+            return "healthy" if schema_data else "unavailable: no data table found"
+        except Exception as e:
+            return f"unhealthy: {str(e)}"
+
+    # Run the probes concurrently; latency is the slowest check, not the sum
+    db_status, ai_status, data_db_status = await asyncio.gather(
+        check_db(), check_ai(), check_data()
+    )
 
     return {
         "status": "healthy" if all("healthy" in status for status in [db_status, ai_status]) else "degraded",
@@ -2243,8 +2785,12 @@ async def test_data_query(
         if not sql_result["success"]:
             return {"success": False, "error": f"SQL generation failed: {sql_result['error']}"}
 
-        # Test SQL execution
-        execution_result = await execute_sql_query(sql_result["sql_query"])
+        # Test SQL execution (joining the mid-stream task if one was started)
+        execution_task = sql_result.get("execution_task")
+        if execution_task is not None:
+            execution_result = await execution_task
+        else:
+            execution_result = await execute_sql_query(sql_result["sql_query"])
         if not execution_result["success"]:
             return {"success": False, "error": f"SQL execution failed: {execution_result['error']}"}
 
@@ -2265,47 +2811,51 @@ async def test_data_query(
         }
 
 # API documentation endpoints
+# The payload never changes, so serialize it once at import and hand the same
+# bytes straight to the socket on every hit
+_API_INFO_JSON = orjson.dumps({
+    "title": "Partners8 Management System",
+    "version": "2.0.0",
+    "description": "A comprehensive system with user management, AI chat with integrated data query capabilities, and data scraping",
+    "endpoints": {
+        "authentication": ["/token", "/signup", "/verify-token"],
+        "user_management": ["/users", "/approve_user/{user_id}", "/promote_to_admin/{user_id}"],
+        "chat": ["/chat", "/chat_sessions", "/chat_sessions/{session_id}/messages"],
+        "database": ["/database/info"],
+        "scraping": ["/start_scraping", "/stop_scraping", "/scraping_status", "/scraping_logs"],
+        "dashboard": ["/dashboard/stats", "/dashboard/user_stats"],
+        "health": ["/health"],
+        "testing": ["/test/ai", "/test/data_query"]
+    },
+    "features": [
+        "User authentication and authorization",
+        "Role-based access control (admin/user)",
+        "Google AI integration with grounding search",
+        "Intelligent query routing (data queries vs general chat)",
+        "Natural language to SQL conversion for real estate data",
+        "Chat sessions with message history and query results",
+        "Background scraping tasks",
+        "Dashboard statistics",
+        "Health monitoring"
+    ],
+    "chat_capabilities": {
+        "general_queries": "Answered using Google AI with grounding search",
+        "data_queries": "Automatically converted to SQL and executed against real estate database",
+        "fallback": "If data query fails, falls back to grounded search",
+        "supported_data_types": [
+            "Real estate prices and rents",
+            "Income limits and demographics",
+            "HUD Fair Market Rents",
+            "Rent-to-value ratios",
+            "Geographic data (cities, states, counties)"
+        ]
+    }
+    })
+
 @app.get("/api/info")
 async def get_api_info():
     """Get API information"""
-    return {
-        "title": "Partners8 Management System",
-        "version": "2.0.0",
-        "description": "A comprehensive system with user management, AI chat with integrated data query capabilities, and data scraping",
-        "endpoints": {
-            "authentication": ["/token", "/signup", "/verify-token"],
-            "user_management": ["/users", "/approve_user/{user_id}", "/promote_to_admin/{user_id}"],
-            "chat": ["/chat", "/chat_sessions", "/chat_sessions/{session_id}/messages"],
-            "database": ["/database/info"],
-            "scraping": ["/start_scraping", "/stop_scraping", "/scraping_status", "/scraping_logs"],
-            "dashboard": ["/dashboard/stats", "/dashboard/user_stats"],
-            "health": ["/health"],
-            "testing": ["/test/ai", "/test/data_query"]
-        },
-        "features": [
-            "User authentication and authorization",
-            "Role-based access control (admin/user)",
-            "Google AI integration with grounding search",
-            "Intelligent query routing (data queries vs general chat)",
-            "Natural language to SQL conversion for real estate data",
-            "Chat sessions with message history and query results",
-            "Background scraping tasks",
-            "Dashboard statistics",
-            "Health monitoring"
-        ],
-        "chat_capabilities": {
-            "general_queries": "Answered using Google AI with grounding search",
-            "data_queries": "Automatically converted to SQL and executed against real estate database",
-            "fallback": "If data query fails, falls back to grounded search",
-            "supported_data_types": [
-                "Real estate prices and rents",
-                "Income limits and demographics",
-                "HUD Fair Market Rents",
-                "Rent-to-value ratios",
-                "Geographic data (cities, states, counties)"
-            ]
-        }
-    }
+    return Response(_API_INFO_JSON, media_type="application/json")
 
 # frontend_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), "partner8-frontend", "out")
 
@@ -2314,14 +2864,20 @@ async def get_api_info():
 # async def serve_dashboard():
 #     return FileResponse(os.path.join(frontend_dir, "dashboard.html"))
 
+# # The dashboard pages are a fixed set of Next.js export files, so enumerate
+# # them once at import time instead of stat()ing the disk on every request
+# DASHBOARD_PAGES = frozenset(
+#     os.path.splitext(name)[0]
+#     for name in os.listdir(os.path.join(frontend_dir, "dashboard"))
+#     if name.endswith(".html")
+# ) if os.path.isdir(os.path.join(frontend_dir, "dashboard")) else frozenset()
+
 # @app.get("/dashboard/{path:path}")
 # async def serve_dashboard_subpaths(path: str):
-#     # This will serve files like /dashboard/chat, /dashboard/users, etc.
-#     # It will look for dashboard/chat.html, dashboard/users.html etc.
-#     # If not found, it will fall back to dashboard.html
-#     file_path = os.path.join(frontend_dir, "dashboard", f"{path}.html")
-#     if os.path.exists(file_path):
-#         return FileResponse(file_path)
+#     # Serves /dashboard/chat, /dashboard/users, etc. from dashboard/<page>.html,
+#     # falling back to dashboard.html for unknown paths
+#     if path in DASHBOARD_PAGES:
+#         return FileResponse(os.path.join(frontend_dir, "dashboard", f"{path}.html"))
 #     return FileResponse(os.path.join(frontend_dir, "dashboard.html"))
 
 # # Serve static files from the Next.js build
@@ -0,0 +1,160 @@
+"""
+Shared-memory progress channel between the scraper subprocess and the API.
+
+Replaces the scraping_progress.json file: instead of re-opening and
+JSON-parsing a file on every poll, both processes mmap the same fixed-size
+region (in /dev/shm when available) holding one packed struct. Writes are
+guarded by a seqlock counter so the reader never sees a torn record and
+neither side ever blocks.
+
+Both processes always run on the same host, so an external broker (e.g.
+Redis pub/sub) would only add a network hop and a service to operate; a
+shared-memory read here is nanoseconds and needs nothing installed.
+"""
+
+import mmap
+import os
+import struct
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Region lives in shared memory when the platform provides it, otherwise in
+# the working directory next to the old JSON file it replaces
+if os.path.isdir("/dev/shm"):
+    PROGRESS_SHM_FILE = "/dev/shm/partners8_progress"
+else:
+    PROGRESS_SHM_FILE = "scraping_progress.shm"
+
+REGION_SIZE = 4096
+TOTAL_STEPS = 6
+
+# seq counter (even = stable, odd = write in progress) followed by the record
+_SEQ = struct.Struct("<I")
+# status 16s, current_step i, total_steps i, records i, pct d, timestamp d,
+# step_name 64s, error_message 256s  (-1 encodes None for the numeric fields)
+_RECORD = struct.Struct("<16siiidd64s256s")
+
+_mm = None
+_last_record = None
+
+
+def _region():
+    """Map the shared region, creating and zero-filling it on first use"""
+    global _mm
+    if _mm is None:
+        fd = os.open(PROGRESS_SHM_FILE, os.O_CREAT | os.O_RDWR, 0o644)
+        try:
+            if os.fstat(fd).st_size < REGION_SIZE:
+                os.ftruncate(fd, REGION_SIZE)
+            _mm = mmap.mmap(fd, REGION_SIZE)
+        finally:
+            os.close(fd)
+    return _mm
+
+
+def _pack_str(value, size):
+    return (value or "").encode("utf-8", "replace")[:size - 1]
+
+
+def _unpack_str(raw):
+    return raw.split(b"\x00", 1)[0].decode("utf-8", "replace") or None
+
+
+def write_progress_file(status: str, current_step: int = None, step_name: str = None,
+                        records_processed: int = None, error_message: str = None):
+    """Publish progress to the shared region (same signature as the old file writer)"""
+    global _last_record
+    record = (status, current_step, records_processed, step_name, error_message)
+    if record == _last_record:
+        # Nothing changed; skip the publish so the seq counter (which readers
+        # use as a change detector / ETag) only moves on real updates
+        return
+    try:
+        mm = _region()
+        seq = _SEQ.unpack_from(mm, 0)[0] + 1
+        _SEQ.pack_into(mm, 0, seq)  # odd: write in progress
+        _RECORD.pack_into(
+            mm, _SEQ.size,
+            _pack_str(status, 16),
+            current_step if current_step is not None else -1,
+            TOTAL_STEPS,
+            records_processed if records_processed is not None else -1,
+            (current_step / TOTAL_STEPS * 100) if current_step else -1.0,
+            time.time(),
+            _pack_str(step_name, 64),
+            _pack_str(error_message, 256),
+        )
+        _SEQ.pack_into(mm, 0, seq + 1)  # even: stable
+        _last_record = record
+    except Exception as e:
+        logger.error(f"Failed to write progress region: {e}")
+
+
+def read_progress_file():
+    """Read the latest progress snapshot, or None if nothing was published yet"""
+    try:
+        # Only stat the backing file before the region is mapped; once mapped,
+        # the seq word alone says whether anything was published
+        if _mm is None and not os.path.exists(PROGRESS_SHM_FILE):
+            return None
+        mm = _region()
+        for _ in range(64):
+            seq1 = _SEQ.unpack_from(mm, 0)[0]
+            if seq1 == 0:
+                return None  # never written (or cleaned up)
+            if seq1 % 2:
+                continue  # writer mid-update, retry
+            fields = _RECORD.unpack_from(mm, _SEQ.size)
+            if _SEQ.unpack_from(mm, 0)[0] != seq1:
+                continue  # torn read, retry
+            status, current_step, total_steps, records, pct, ts, step_name, error = fields
+            return {
+                "status": _unpack_str(status),
+                "current_step": current_step if current_step >= 0 else None,
+                "total_steps": total_steps,
+                "step_name": _unpack_str(step_name),
+                "records_processed": records if records >= 0 else None,
+                "error_message": _unpack_str(error),
+                "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(ts)) if ts else None,
+                "progress_percentage": pct if pct >= 0 else None,
+            }
+        return None
+    except Exception as e:
+        logger.error(f"Failed to read progress region: {e}")
+        return None
+
+
+def progress_version():
+    """Monotonic write counter for the region (0 if nothing was published)
+
+    Every publish bumps the seqlock word twice, so comparing this value
+    between polls is enough to know whether anything changed.
+    """
+    try:
+        if _mm is None and not os.path.exists(PROGRESS_SHM_FILE):
+            return 0
+        return _SEQ.unpack_from(_region(), 0)[0]
+    except Exception:
+        return 0
+
+
+def progress_available():
+    """Whether a progress snapshot has been published"""
+    return read_progress_file() is not None
+
+
+def cleanup_progress_file():
+    """Reset the region so the next reader sees no stale progress"""
+    global _mm, _last_record
+    _last_record = None
+    try:
+        if _mm is not None:
+            _mm[:] = b"\x00" * REGION_SIZE
+            _mm.close()
+            _mm = None
+        if os.path.exists(PROGRESS_SHM_FILE):
+            os.remove(PROGRESS_SHM_FILE)
+    except Exception as e:
+        logger.error(f"Failed to cleanup progress region: {e}")
@@ -1,6 +1,7 @@
+import asyncio
+import aiohttp
 import requests
 import pandas as pd
-import json
 import os
 import time
 import sqlite3
@@ -9,11 +10,13 @@ import numpy as np
 import logging
 import signal
 import threading
-import pickle
+import shutil
+import orjson
+import re
 from datetime import datetime
-from fuzzywuzzy import fuzz
+from rapidfuzz import fuzz, process as rf_process
 from tqdm import tqdm
-from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from requests.adapters import HTTPAdapter
 from urllib3.util.retry import Retry
 
@@ -25,28 +28,8 @@ logger = logging.getLogger(__name__)
 # PROGRESS TRACKING
 # =============================================================================
 
-# Progress file for communication with main process
-PROGRESS_FILE = "scraping_progress.json"
-
-def write_progress_file(status: str, current_step: int = None, step_name: str = None, 
-                       records_processed: int = None, error_message: str = None):
-    """Write progress information to file for the main process to read"""
-    try:
-        progress_data = {
-            "status": status,
-            "current_step": current_step,
-            "total_steps": 6,
-            "step_name": step_name,
-            "records_processed": records_processed,
-            "error_message": error_message,
-            "timestamp": datetime.now().isoformat(),
-            "progress_percentage": (current_step / 6 * 100) if current_step else None
-        }
-        
-        with open(PROGRESS_FILE, 'w') as f:
-            json.dump(progress_data, f)
-    except Exception as e:
-        logger.error(f"Failed to write progress file: {e}")
+# Shared-memory progress region for communication with the main process
+from progress_ipc import write_progress_file, cleanup_progress_file
 
 # =============================================================================
 # CONFIGURATION
@@ -61,20 +44,25 @@ HUD_HEADERS = {"Authorization": f"Bearer {HUD_API_KEY}"}
 OUTPUT_DIR = "partners8_data"
 ZILLOW_DIR = os.path.join(OUTPUT_DIR, "zillow_data")
 FINAL_OUTPUT = "partners8_final_data.csv"
-STATE_FILE = "pipeline_state.pkl"
+STATE_DIR = "pipeline_state"
 
-# Thread safety for HUD API calls
-lock = threading.Lock()
+# HUD API pacing: all fetches run on one event loop, so the cache is a plain
+# dict and the rate limiter hands out send slots MIN_REQUEST_INTERVAL apart
 fips_cache = {}
-cache_lock = threading.Lock()
-request_lock = threading.Lock()
-last_request_time = 0
+FIPS_CACHE_DB = "fips_cache.db"
+_fips_db = None
 MIN_REQUEST_INTERVAL = 0.1
+HUD_CONCURRENCY = 10
+_hud_semaphore = None  # created on the event loop in step 3
+_rate_lock = None
+_next_request_slot = 0.0
+_state_counties_cache = {}  # state_code -> in-flight/completed listCounties task
 
 # Control flags
 class PipelineController:
     def __init__(self):
         self.should_stop = False
+        self.paused = False
         self.current_step = 0
         self.total_steps = 6
         self.step_names = [
@@ -93,10 +81,31 @@ class PipelineController:
             write_progress_file("stopped", self.current_step, "Pipeline stopped")
             print("\n🛑 Stop signal received. Pipeline will halt gracefully...")
             
+    def pause(self):
+        # Runs inside a signal handler: flipping the bool is atomic under the
+        # GIL, and taking self.lock here could deadlock the interrupted thread
+        if not self.paused:
+            self.paused = True
+            write_progress_file("paused", self.current_step, "Pipeline paused")
+            print("\n⏸️ Pause signal received. Pipeline will wait...")
+
+    def resume(self):
+        if self.paused:
+            self.paused = False
+            write_progress_file("running", self.current_step, "Pipeline resumed")
+            print("\n▶️ Resume signal received. Pipeline continuing...")
+
     def check_should_continue(self):
-        with self.lock:
-            return not self.should_stop
-            
+        # Park here while paused; a stop signal still wins over pause
+        while True:
+            with self.lock:
+                if self.should_stop:
+                    return False
+            if not self.paused:
+                return True
+            time.sleep(0.5)
+
+
     def set_current_step(self, step, step_name):
         with self.lock:
             self.current_step = step
@@ -115,47 +124,61 @@ def signal_handler(signum, frame):
 # =============================================================================
 
 class StateManager:
-    def __init__(self, state_file=STATE_FILE):
-        self.state_file = state_file
-        
+    # DataFrames checkpointed as Parquet (zstd); everything else goes in state.json
+    FRAME_KEYS = ('final_data', 'zhvi_data', 'zori_data')
+
+    def __init__(self, state_dir=STATE_DIR):
+        self.state_dir = state_dir
+        self.meta_file = os.path.join(state_dir, "state.json")
+
     def save_state(self, pipeline_data):
         """Save current pipeline state"""
         try:
+            os.makedirs(self.state_dir, exist_ok=True)
+            for name in self.FRAME_KEYS:
+                df = pipeline_data.get(name)
+                if df is not None:
+                    df.to_parquet(os.path.join(self.state_dir, f"{name}.parquet"),
+                                  compression='zstd')
             state = {
                 'timestamp': datetime.now().isoformat(),
                 'current_step': controller.current_step,
-                'final_data': pipeline_data.get('final_data'),
-                'zhvi_data': pipeline_data.get('zhvi_data'),
-                'zori_data': pipeline_data.get('zori_data'),
                 'hud_progress': pipeline_data.get('hud_progress', {}),
                 'nar_progress': pipeline_data.get('nar_progress', {}),
             }
-            
-            with open(self.state_file, 'wb') as f:
-                pickle.dump(state, f)
-            logger.info(f"💾 State saved to {self.state_file}")
-            
+            with open(self.meta_file, 'wb') as f:
+                f.write(orjson.dumps(state))
+            logger.info(f"💾 State saved to {self.state_dir}")
+
         except Exception as e:
             logger.error(f"❌ Failed to save state: {e}")
-    
+
     def load_state(self):
         """Load previous pipeline state"""
         try:
-            if os.path.exists(self.state_file):
-                with open(self.state_file, 'rb') as f:
-                    state = pickle.load(f)
-                logger.info(f"📂 State loaded from {self.state_file}")
-                return state
-            return None
+            if not os.path.exists(self.meta_file):
+                return None
+            with open(self.meta_file, 'rb') as f:
+                state = orjson.loads(f.read())
+            # Only read back the frames the resume point still needs: once the
+            # merge (step 2) is done, the raw ZHVI/ZORI frames are never touched
+            step = state.get('current_step', 0)
+            needed = ('final_data',) if step >= 2 else self.FRAME_KEYS
+            for name in needed:
+                frame_path = os.path.join(self.state_dir, f"{name}.parquet")
+                if os.path.exists(frame_path):
+                    state[name] = pd.read_parquet(frame_path)
+            logger.info(f"📂 State loaded from {self.state_dir}")
+            return state
         except Exception as e:
             logger.error(f"❌ Failed to load state: {e}")
             return None
-    
+
     def clear_state(self):
         """Clear saved state"""
         try:
-            if os.path.exists(self.state_file):
-                os.remove(self.state_file)
+            if os.path.exists(self.state_dir):
+                shutil.rmtree(self.state_dir)
                 logger.info("🗑️ Previous state cleared")
         except Exception as e:
             logger.error(f"❌ Failed to clear state: {e}")
@@ -171,7 +194,19 @@ class ZillowDataDownloader:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        
+        adapter = HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"]
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
         # Create directories
         os.makedirs(ZILLOW_DIR, exist_ok=True)
         
@@ -209,16 +244,16 @@ class ZillowDataDownloader:
             logger.info(f"Downloading {zillow_urls['zhvi']['description']}...")
             write_progress_file("running", 1, "Downloading ZHVI data...")
             
-            zhvi_response = self.session.get(zillow_urls['zhvi']['url'], timeout=60)
-            zhvi_response.raise_for_status()
-            
-            if not controller.check_should_continue():
-                return False, []
-            
             zhvi_filepath = os.path.join(ZILLOW_DIR, zillow_urls['zhvi']['filename'])
-            with open(zhvi_filepath, 'wb') as f:
-                f.write(zhvi_response.content)
-            
+            # Stream straight to disk so the 100MB+ CSV never sits in RAM twice
+            with self.session.get(zillow_urls['zhvi']['url'], stream=True, timeout=60) as zhvi_response:
+                zhvi_response.raise_for_status()
+                with open(zhvi_filepath, 'wb') as f:
+                    for chunk in zhvi_response.iter_content(chunk_size=1 << 20):
+                        if not controller.check_should_continue():
+                            return False, []
+                        f.write(chunk)
+
             self.zhvi_data = pd.read_csv(zhvi_filepath)
             downloaded_files.append(zhvi_filepath)
             logger.info(f"✅ ZHVI data: {len(self.zhvi_data)} records")
@@ -237,16 +272,15 @@ class ZillowDataDownloader:
             logger.info(f"Downloading {zillow_urls['zori']['description']}...")
             write_progress_file("running", 1, "Downloading ZORI data...")
             
-            zori_response = self.session.get(zillow_urls['zori']['url'], timeout=60)
-            zori_response.raise_for_status()
-            
-            if not controller.check_should_continue():
-                return False, downloaded_files
-            
             zori_filepath = os.path.join(ZILLOW_DIR, zillow_urls['zori']['filename'])
-            with open(zori_filepath, 'wb') as f:
-                f.write(zori_response.content)
-            
+            with self.session.get(zillow_urls['zori']['url'], stream=True, timeout=60) as zori_response:
+                zori_response.raise_for_status()
+                with open(zori_filepath, 'wb') as f:
+                    for chunk in zori_response.iter_content(chunk_size=1 << 20):
+                        if not controller.check_should_continue():
+                            return False, downloaded_files
+                        f.write(chunk)
+
             self.zori_data = pd.read_csv(zori_filepath)
             downloaded_files.append(zori_filepath)
             logger.info(f"✅ ZORI data: {len(self.zori_data)} records")
@@ -265,82 +299,109 @@ class ZillowDataDownloader:
 # HUD DATA FETCHER
 # =============================================================================
 
-def create_session():
-    """Create a session with retry strategy"""
-    session = requests.Session()
-    retry_strategy = Retry(
-        total=3,
-        backoff_factor=1,
-        status_forcelist=[429, 500, 502, 503, 504],
-        allowed_methods=["GET"]
-    )
-    adapter = HTTPAdapter(max_retries=retry_strategy)
-    session.mount("http://", adapter)
-    session.mount("https://", adapter)
-    return session
-
-def rate_limited_request(url, headers, timeout=30, max_retries=3):
-    """Make a rate-limited request with exponential backoff"""
-    global last_request_time
-    
+def load_fips_cache():
+    """Warm the in-memory FIPS cache from disk so reruns skip resolved counties"""
+    global _fips_db
+    if _fips_db is not None:
+        return
+    try:
+        _fips_db = sqlite3.connect(FIPS_CACHE_DB)
+        _fips_db.execute("CREATE TABLE IF NOT EXISTS fips (key TEXT PRIMARY KEY, value TEXT)")
+        _fips_db.commit()
+        fips_cache.update(_fips_db.execute("SELECT key, value FROM fips"))
+        if fips_cache:
+            logger.info(f"📂 Loaded {len(fips_cache)} cached FIPS lookups")
+    except Exception as e:
+        logger.error(f"❌ Failed to open FIPS cache: {e}")
+
+def persist_fips_entry(key, value):
+    """Write one resolved (or failed) FIPS lookup through to disk"""
+    if _fips_db is None:
+        return
+    try:
+        _fips_db.execute("INSERT OR REPLACE INTO fips (key, value) VALUES (?, ?)", (key, value))
+        _fips_db.commit()
+    except Exception as e:
+        logger.debug(f"Failed to persist FIPS cache entry: {e}")
+
+async def _list_counties(session, state_code):
+    """Fetch the HUD county list for a state, once per state per run
+
+    FIPS lookups for different counties in the same state all start from the
+    same listCounties response, so the first caller's fetch is shared (as a
+    task, so concurrent first-misses await one request instead of racing).
+    Failures are not cached; the next row for that state retries.
+    """
+    task = _state_counties_cache.get(state_code)
+    if task is None:
+        url = f"{HUD_BASE_URL}/fmr/listCounties/{state_code}?updated=2025"
+        task = asyncio.ensure_future(rate_limited_request(session, url))
+        _state_counties_cache[state_code] = task
+    result = await task
+    if result is None:
+        _state_counties_cache.pop(state_code, None)
+    return result
+
+async def rate_limited_request(session, url, timeout=30, max_retries=3):
+    """Make a rate-limited request with exponential backoff, returning parsed JSON"""
+    global _next_request_slot
+
     if not controller.check_should_continue():
         return None
-    
-    session = create_session()
-    
+
     for attempt in range(max_retries):
         if not controller.check_should_continue():
             return None
-            
-        with request_lock:
-            current_time = time.time()
-            time_since_last = current_time - last_request_time
-            if time_since_last < MIN_REQUEST_INTERVAL:
-                time.sleep(MIN_REQUEST_INTERVAL - time_since_last)
-            last_request_time = time.time()
-        
+
+        # Claim the next send slot; sleeping happens outside the lock so
+        # waiting coroutines line up instead of serializing each other.
+        # Monotonic clock: immune to wall-clock jumps mid-run
+        async with _rate_lock:
+            now = time.monotonic()
+            wait = _next_request_slot - now
+            _next_request_slot = max(now, _next_request_slot) + MIN_REQUEST_INTERVAL
+        if wait > 0:
+            await asyncio.sleep(wait)
+
         try:
-            response = session.get(url, headers=headers, timeout=timeout)
-            
-            if response.status_code == 200:
-                return response
-            elif response.status_code == 429:
-                wait_time = (2 ** attempt) + random.uniform(0, 1)
-                logger.warning(f"Rate limited. Waiting {wait_time:.2f}s before retry {attempt + 1}/{max_retries}")
-                time.sleep(wait_time)
-                continue
-            else:
-                logger.warning(f"Request failed with status {response.status_code}")
-                return None
-                
-        except requests.exceptions.RequestException as e:
+            async with _hud_semaphore:
+                async with session.get(url, headers=HUD_HEADERS,
+                                       timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                    if response.status == 200:
+                        return orjson.loads(await response.read())
+                    elif response.status == 429:
+                        wait_time = (2 ** attempt) + random.uniform(0, 1)
+                        logger.warning(f"Rate limited. Waiting {wait_time:.2f}s before retry {attempt + 1}/{max_retries}")
+                        await asyncio.sleep(wait_time)
+                        continue
+                    else:
+                        logger.warning(f"Request failed with status {response.status}")
+                        return None
+
+        except (aiohttp.ClientError, asyncio.TimeoutError) as e:
             logger.warning(f"Request error (attempt {attempt + 1}/{max_retries}): {e}")
             if attempt < max_retries - 1:
-                time.sleep(2 ** attempt)
+                await asyncio.sleep(2 ** attempt)
             continue
-    
+
     return None
 
-def get_fips_code(state_code, city_name, county_name):
+async def get_fips_code(session, state_code, city_name, county_name):
     """Get FIPS code with caching and rate limiting"""
     if not controller.check_should_continue():
         return None
-        
+
     cache_key = f"{state_code}_{county_name}"
-    
-    with cache_lock:
-        if cache_key in fips_cache:
-            return fips_cache[cache_key]
-    
+
+    if cache_key in fips_cache:
+        return fips_cache[cache_key]
+
     try:
-        url = f"{HUD_BASE_URL}/fmr/listCounties/{state_code}?updated=2025"
-        response = rate_limited_request(url, HUD_HEADERS)
-        
-        if response is None:
+        json_response = await _list_counties(session, state_code)
+
+        if json_response is None:
             return None
-        
-        json_response = response.json()
-        
+
         if isinstance(json_response, dict):
             counties = json_response.get('data', [])
         elif isinstance(json_response, list):
@@ -349,40 +410,41 @@ def get_fips_code(state_code, city_name, county_name):
             return None
         
         normalized_county_name = ' '.join(county_name.strip().split()).lower()
-        
-        fips_result = None
-        for area in counties:
-            api_county_name = area.get('cntyname', '').strip().lower()
-            if api_county_name == normalized_county_name:
-                fips_result = area.get('fips_code')
-                break
-            similarity = fuzz.ratio(api_county_name, normalized_county_name)
-            if similarity > 75:
-                fips_result = area.get('fips_code')
-                break
-        
-        with cache_lock:
-            fips_cache[cache_key] = fips_result
-        
+        # One pass builds the exact-lookup table; the old membership test plus
+        # .index() scanned the county list twice before any fuzzy scoring
+        county_fips = {area.get('cntyname', '').strip().lower(): area.get('fips_code')
+                       for area in counties}
+
+        fips_result = county_fips.get(normalized_county_name)
+        if fips_result is None:
+            # Only non-exact names pay for fuzzy scoring, in one C++ call
+            best = rf_process.extractOne(normalized_county_name, list(county_fips),
+                                         scorer=fuzz.ratio, score_cutoff=75)
+            if best is not None:
+                fips_result = county_fips[best[0]]
+        
+        fips_cache[cache_key] = fips_result
+        persist_fips_entry(cache_key, fips_result)
+
         return fips_result
         
     except Exception as e:
         logger.debug(f"Error fetching FIPS for {state_code}, {city_name}: {e}")
         return None
 
-def get_fmr_data(entityid, year="2025"):
+async def get_fmr_data(session, entityid, year="2025"):
     """Get Fair Market Rent data with rate limiting"""
     if not controller.check_should_continue():
         return None
-        
+
     try:
         url = f"{HUD_BASE_URL}/fmr/data/{entityid}?year={year}"
-        response = rate_limited_request(url, HUD_HEADERS)
-        
-        if response is None:
+        json_response = await rate_limited_request(session, url)
+
+        if json_response is None:
             return None
-            
-        data = response.json().get('data', {})
+
+        data = json_response.get('data', {})
         basicdata = data.get('basicdata', {})
         if isinstance(basicdata, list):
             basicdata = next((item for item in basicdata if item.get('zip_code') == 'MSA level'), basicdata[0])
@@ -397,26 +459,26 @@ def get_fmr_data(entityid, year="2025"):
         logger.debug(f"Error fetching FMR for {entityid}: {e}")
         return None
 
-def get_income_limits(entityid, year="2025"):
+async def get_income_limits(session, entityid, year="2025"):
     """Get income limits data with rate limiting"""
     if not controller.check_should_continue():
         return None
-        
+
     try:
         url = f"{HUD_BASE_URL}/il/data/{entityid}?year={year}"
-        response = rate_limited_request(url, HUD_HEADERS)
-        
-        if response is None:
+        json_response = await rate_limited_request(session, url)
+
+        if json_response is None:
             return None
-            
-        data = response.json().get('data', {})
+
+        data = json_response.get('data', {})
         very_low = data.get('very_low', {})
         return float(very_low.get('il50_p4', pd.NA))
     except Exception as e:
         logger.debug(f"Error fetching Income Limits for {entityid}: {e}")
         return None
 
-def process_hud_row(row_data):
+async def process_hud_row(session, row_data):
     """Process a single row - fetch FIPS, FMR, and Income Limits"""
     if not controller.check_should_continue():
         return None
@@ -438,21 +500,22 @@ def process_hud_row(row_data):
     }
     
     # Get FIPS code
-    fips_code = get_fips_code(state_code, city_name, county_name)
+    fips_code = await get_fips_code(session, state_code, city_name, county_name)
     if fips_code and controller.check_should_continue():
         result['entityid'] = fips_code
-        
-        # Get FMR data
-        fmr_data = get_fmr_data(fips_code)
+
+        # FMR and income limits hit different endpoints; fetch them together
+        fmr_data, income_limit = await asyncio.gather(
+            get_fmr_data(session, fips_code),
+            get_income_limits(session, fips_code)
+        )
         if fmr_data and controller.check_should_continue():
             result['Efficiency'] = fmr_data['Efficiency']
             result['OneBedroom'] = fmr_data['One-Bedroom']
             result['TwoBedroom'] = fmr_data['Two-Bedroom']
             result['ThreeBedroom'] = fmr_data['Three-Bedroom']
             result['FourBedroom'] = fmr_data['Four-Bedroom']
-        
-        # Get Income Limits
-        income_limit = get_income_limits(fips_code)
+
         if income_limit and controller.check_should_continue():
             result['Income Limits'] = income_limit
     
@@ -462,6 +525,54 @@ def process_hud_row(row_data):
 # NAR DATA EXTRACTOR
 # =============================================================================
 
+# State abbreviation to full name mapping
+STATE_MAPPING = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
+    'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
+    'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
+    'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
+    'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
+    'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
+    'DC': 'District of Columbia'
+}
+
+# Non-"County" suffixes in Census place names (Louisiana, Alaska); compiled
+# once and applied only to the few rows the plain-suffix fast path misses
+_CENSUS_SUFFIX_RE = re.compile(r' (?:City and Borough|Census Area|Borough|Parish)$')
+
+@lru_cache(maxsize=None)
+def normalize_county_name(name):
+    """Normalize county names for better matching (cached per distinct name)"""
+    if pd.isna(name):
+        return ""
+
+    # Convert to string and normalize
+    normalized = str(name).strip().lower()
+
+    # Remove common suffixes
+    suffixes_to_remove = [' county', ' parish', ' borough', ' census area', ' city and borough']
+    for suffix in suffixes_to_remove:
+        if normalized.endswith(suffix):
+            normalized = normalized[:-len(suffix)]
+            break
+
+    # Handle special cases
+    replacements = {
+        'st.': 'saint',
+        'st ': 'saint ',
+        'ste.': 'sainte',
+        'ste ': 'sainte ',
+    }
+
+    for old, new in replacements.items():
+        normalized = normalized.replace(old, new)
+
+    return normalized.strip()
+
 class NARDataExtractor:
     def __init__(self):
         """Initialize NAR data extractor"""
@@ -469,22 +580,19 @@ class NARDataExtractor:
         self.session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
-        
-        # State abbreviation to full name mapping
-        self.state_mapping = {
-            'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
-            'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
-            'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
-            'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
-            'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi', 'MO': 'Missouri',
-            'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire', 'NJ': 'New Jersey',
-            'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina', 'ND': 'North Dakota', 'OH': 'Ohio',
-            'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania', 'RI': 'Rhode Island', 'SC': 'South Carolina',
-            'SD': 'South Dakota', 'TN': 'Tennessee', 'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont',
-            'VA': 'Virginia', 'WA': 'Washington', 'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming',
-            'DC': 'District of Columbia'
-        }
-    
+        adapter = HTTPAdapter(
+            pool_connections=8,
+            pool_maxsize=8,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                allowed_methods=["GET"]
+            )
+        )
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
     def get_census_county_data(self):
         """Get median home values from Census ACS data (NAR's source)"""
         if not controller.check_should_continue():
@@ -501,16 +609,22 @@ class NARDataExtractor:
             if not controller.check_should_continue():
                 return None
             
-            data = response.json()
+            data = orjson.loads(response.content)
             headers = data[0]
             rows = data[1:]
             census_df = pd.DataFrame(rows, columns=headers)
             
             # Clean and parse data
             census_df['NMediumValue'] = pd.to_numeric(census_df['B25077_001E'], errors='coerce')
-            county_state = census_df['NAME'].str.extract(r'(.+) County, (.+)')
-            census_df['County'] = county_state[0]
-            census_df['State'] = county_state[1]
+            # NAME is "X County, State" for ~96% of rows; rsplit + suffix
+            # strip runs as C-level string ops with no per-row regex. The
+            # Parish/Borough/Census Area names take one compiled-regex pass.
+            parts = census_df['NAME'].str.rsplit(', ', n=1, expand=True)
+            county = parts[0].str.removesuffix(' County')
+            slow = county.str.endswith((' Parish', ' Borough', ' Census Area'))
+            county.loc[slow] = county.loc[slow].str.replace(_CENSUS_SUFFIX_RE, '', regex=True)
+            census_df['County'] = county
+            census_df['State'] = parts[1]
             
             # Remove null values
             census_df = census_df.dropna(subset=['NMediumValue', 'County', 'State'])
@@ -525,42 +639,6 @@ class NARDataExtractor:
             write_progress_file("failed", 4, f"Census data failed: {str(e)}")
             return None
     
-    def normalize_county_name(self, name):
-        """Normalize county names for better matching"""
-        if pd.isna(name):
-            return ""
-        
-        # Convert to string and normalize
-        normalized = str(name).strip().lower()
-        
-        # Remove common suffixes
-        suffixes_to_remove = [' county', ' parish', ' borough', ' census area', ' city and borough']
-        for suffix in suffixes_to_remove:
-            if normalized.endswith(suffix):
-                normalized = normalized[:-len(suffix)]
-                break
-        
-        # Handle special cases
-        replacements = {
-            'st.': 'saint',
-            'st ': 'saint ',
-            'ste.': 'sainte',
-            'ste ': 'sainte ',
-        }
-        
-        for old, new in replacements.items():
-            normalized = normalized.replace(old, new)
-        
-        return normalized.strip()
-    
-    def normalize_state_name(self, state_abbrev):
-        """Convert state abbreviation to full name"""
-        if pd.isna(state_abbrev):
-            return ""
-        
-        state_str = str(state_abbrev).strip().upper()
-        return self.state_mapping.get(state_str, state_str)
-    
     def match_nar_data(self, data_df, census_data):
         """Match census data to existing data and update NMediumValue"""
         if census_data is None or not controller.check_should_continue():
@@ -570,68 +648,74 @@ class NARDataExtractor:
         logger.info("🔗 Matching NAR data...")
         write_progress_file("running", 4, "Matching NAR data to cities...")
         
-        # Prepare data for matching
-        data_df['county_clean'] = data_df['County'].apply(self.normalize_county_name)
-        data_df['state_full'] = data_df['State'].apply(self.normalize_state_name)
-        
-        census_data['county_clean'] = census_data['County'].apply(self.normalize_county_name)
-        census_data['state_clean'] = census_data['State'].apply(lambda x: str(x).strip())
+        # Prepare data for matching; .map hits the lru_cache once per
+        # distinct name, and the state expansion is a vectorized dict map
+        data_df['county_clean'] = data_df['County'].map(normalize_county_name)
+        states = data_df['State'].astype(str).str.strip().str.upper()
+        data_df['state_full'] = states.map(STATE_MAPPING).fillna(states)
+
+        census_data['county_clean'] = census_data['County'].map(normalize_county_name)
+        census_data['state_clean'] = census_data['State'].astype(str).str.strip()
         
         # Initialize NMediumValue column if it doesn't exist or reset it
         data_df['NMediumValue'] = pd.NA
-        
-        matches = 0
+
         total_rows = len(data_df)
-        
-        # Create a lookup dictionary for faster matching
-        census_lookup = {}
-        for _, row in census_data.iterrows():
-            key = (row['county_clean'], row['state_clean'])
-            census_lookup[key] = row['NMediumValue']
-        
-        # Match records with progress checking
-        for idx, row in data_df.iterrows():
+
+        # Exact matches resolve in one vectorized merge; only the leftover
+        # rows ever reach the Python-level fuzzy fallback
+        census_subset = census_data[['county_clean', 'state_clean', 'NMediumValue']] \
+            .drop_duplicates(['county_clean', 'state_clean'], keep='last')
+        merged = data_df[['county_clean', 'state_full']].merge(
+            census_subset,
+            left_on=['county_clean', 'state_full'],
+            right_on=['county_clean', 'state_clean'],
+            how='left'
+        )
+        data_df['NMediumValue'] = merged['NMediumValue'].values
+        matches = int(data_df['NMediumValue'].notna().sum())
+        write_progress_file("running", 4, f"NAR exact matching: {matches}/{total_rows} matched", matches)
+
+        # Per-state candidate lists so fuzzy fallback scores one small batch
+        # per row instead of iterating census rows in Python
+        state_groups = {
+            state: (group['county_clean'].tolist(), group['NMediumValue'].tolist())
+            for state, group in census_data.groupby('state_clean')
+        }
+
+        unmatched = data_df[
+            data_df['NMediumValue'].isna()
+            & data_df['county_clean'].notna()
+            & data_df['state_full'].notna()
+        ]
+        # One cdist call per state computes the whole unmatched x candidates
+        # score matrix in C++ (multi-threaded) instead of looping per row
+        for state_full, group in unmatched.groupby('state_full'):
             if not controller.check_should_continue():
                 break
-                
-            if pd.notna(row['county_clean']) and pd.notna(row['state_full']):
-                county_clean = row['county_clean']
-                state_full = row['state_full']
-                
-                # Try exact match first
-                lookup_key = (county_clean, state_full)
-                if lookup_key in census_lookup:
-                    data_df.at[idx, 'NMediumValue'] = census_lookup[lookup_key]
-                    matches += 1
-                    continue
-                
-                # Try fuzzy matching within same state
-                state_data = census_data[census_data['state_clean'] == state_full]
-                if len(state_data) == 0:
-                    continue
-                
-                best_match = None
-                best_score = 0
-                
-                for _, census_row in state_data.iterrows():
-                    similarity = fuzz.ratio(county_clean, census_row['county_clean'])
-                    if similarity > best_score and similarity > 80:  # 80% similarity threshold
-                        best_score = similarity
-                        best_match = census_row
-                
-                if best_match is not None:
-                    data_df.at[idx, 'NMediumValue'] = best_match['NMediumValue']
+
+            candidates = state_groups.get(state_full)
+            if not candidates:
+                continue
+
+            names = group['county_clean'].tolist()
+            scores = rf_process.cdist(names, candidates[0], scorer=fuzz.ratio,
+                                      score_cutoff=80, workers=-1)  # 80% similarity threshold
+            best_idx = scores.argmax(axis=1)
+            best_score = scores.max(axis=1)
+
+            for row_pos, idx in enumerate(group.index):
+                if best_score[row_pos] >= 80:
+                    data_df.at[idx, 'NMediumValue'] = candidates[1][best_idx[row_pos]]
                     matches += 1
-                    
+
                     # Log fuzzy matches for debugging
-                    if best_score < 100:
-                        logger.debug(f"Fuzzy match ({best_score}%): '{county_clean}' -> '{best_match['county_clean']}' in {state_full}")
-            
-            # Update progress periodically
-            if idx % 1000 == 0:
-                progress = f"Matching NAR data: {idx}/{total_rows} processed"
-                write_progress_file("running", 4, progress, matches)
-        
+                    if best_score[row_pos] < 100:
+                        logger.debug(f"Fuzzy match ({best_score[row_pos]:.0f}%): "
+                                     f"'{names[row_pos]}' -> '{candidates[0][best_idx[row_pos]]}' in {state_full}")
+
+            write_progress_file("running", 4, f"Fuzzy matching NAR data: {state_full} done", matches)
+
         # Clean up temporary columns
         data_df.drop(['county_clean', 'state_full'], axis=1, inplace=True)
         census_data.drop(['county_clean', 'state_clean'], axis=1, inplace=True)
@@ -663,18 +747,15 @@ class RatioCalculator:
             if col in data_df.columns:
                 data_df[col] = pd.to_numeric(data_df[col], errors='coerce')
         
-        # Calculate ratios
-        data_df['Zillow Ratio'] = data_df['ZMediumRent'] / data_df['ZMediumValue']
-        data_df['NAR Ratio'] = data_df['ZMediumRent'] / data_df['NMediumValue']
-        data_df['ZH Ratio'] = data_df['FourBedroom'] / data_df['ZMediumValue']
-        data_df['NH Ratio'] = data_df['FourBedroom'] / data_df['NMediumValue']
-        
-        # Clean infinite values
+        # All four ratios in one numpy pass over contiguous float64 blocks;
+        # where=den!=0 leaves NaN in place of the infs the old per-column
+        # divisions produced, so no second cleanup pass is needed
         ratio_columns = ['Zillow Ratio', 'NAR Ratio', 'ZH Ratio', 'NH Ratio']
-        for col in ratio_columns:
-            infinite_mask = np.isinf(data_df[col])
-            data_df.loc[infinite_mask, col] = np.nan
-        
+        num = data_df[['ZMediumRent', 'ZMediumRent', 'FourBedroom', 'FourBedroom']].to_numpy(dtype=float)
+        den = data_df[['ZMediumValue', 'NMediumValue', 'ZMediumValue', 'NMediumValue']].to_numpy(dtype=float)
+        ratios = np.divide(num, den, out=np.full_like(num, np.nan), where=den != 0)
+        data_df[ratio_columns] = ratios
+
         # Log results
         for col in ratio_columns:
             valid_count = data_df[col].notna().sum()
@@ -837,71 +918,81 @@ class Partners8Pipeline:
             write_progress_file("failed", 3, "No data available for HUD processing")
             return 0
         
-        # Prepare data for processing
-        row_data = [(index, row) for index, row in self.final_data.iterrows()]
-        
-        # Process in batches
-        batch_size = max_workers * 2
-        total_batches = (len(row_data) + batch_size - 1) // batch_size
-        
-        with tqdm(total=len(row_data), desc="Fetching HUD data") as pbar:
-            for batch_num in range(total_batches):
-                if not controller.check_should_continue():
-                    break
-                    
-                start_idx = batch_num * batch_size
-                end_idx = min((batch_num + 1) * batch_size, len(row_data))
-                batch_data = row_data[start_idx:end_idx]
-                
-                # Update progress
-                progress_percent = (batch_num / total_batches) * 100
-                records_so_far = start_idx
-                write_progress_file("running", 3, f"Fetching HUD data: {progress_percent:.1f}% complete", records_so_far)
-                
-                # Process batch with threading
-                with ThreadPoolExecutor(max_workers=min(max_workers, len(batch_data))) as executor:
-                    future_to_row = {executor.submit(process_hud_row, row): row for row in batch_data}
-                    results = []
-                    
-                    for future in as_completed(future_to_row):
-                        if not controller.check_should_continue():
-                            # Cancel remaining futures
-                            for f in future_to_row:
-                                f.cancel()
-                            break
-                            
-                        try:
-                            result = future.result()
-                            results.append(result)
-                            pbar.update(1)
-                        except Exception as exc:
-                            pbar.update(1)
-                    
-                    # Update dataframe with results
-                    for result in results:
-                        if result and controller.check_should_continue():
-                            with lock:
-                                self.final_data.at[result['index'], 'entityid'] = result['entityid']
-                                self.final_data.at[result['index'], 'Income Limits'] = result['Income Limits']
-                                self.final_data.at[result['index'], 'Efficiency'] = result['Efficiency']
-                                self.final_data.at[result['index'], 'OneBedroom'] = result['OneBedroom']
-                                self.final_data.at[result['index'], 'TwoBedroom'] = result['TwoBedroom']
-                                self.final_data.at[result['index'], 'ThreeBedroom'] = result['ThreeBedroom']
-                                self.final_data.at[result['index'], 'FourBedroom'] = result['FourBedroom']
-                
-                # Save progress and delay between batches
-                if batch_num % 5 == 0:  # Save every 5 batches
-                    self.save_current_state()
-                
-                if batch_num < total_batches - 1 and controller.check_should_continue():
-                    time.sleep(1)
-        
+        asyncio.run(self._fetch_hud_data_async(max_workers))
+
         hud_success_count = self.final_data['entityid'].notna().sum()
         logger.info(f"✅ HUD data fetched: {hud_success_count}/{len(self.final_data)} rows")
         write_progress_file("running", 3, f"HUD data completed: {hud_success_count} records", hud_success_count)
         self.save_current_state()
         return hud_success_count
-    
+
+    async def _fetch_hud_data_async(self, max_concurrency):
+        """Fan HUD row lookups out over one aiohttp session on a single event loop"""
+        global _hud_semaphore, _rate_lock, _next_request_slot
+        _hud_semaphore = asyncio.Semaphore(max_concurrency)
+        _rate_lock = asyncio.Lock()
+        _next_request_slot = 0.0
+        _state_counties_cache.clear()  # tasks are bound to the previous loop
+        load_fips_cache()
+
+        row_data = [(index, row) for index, row in self.final_data.iterrows()]
+
+        # Batches only bound the checkpoint interval now; concurrency and
+        # pacing are enforced by the semaphore and the send-slot limiter
+        batch_size = max_concurrency * 2
+        total_batches = (len(row_data) + batch_size - 1) // batch_size
+
+        # One session for the whole step: keep-alive connections are reused
+        # across the three HUD calls every row makes against the same host
+        connector = aiohttp.TCPConnector(limit=64, ttl_dns_cache=300,
+                                         keepalive_timeout=60)
+        async with aiohttp.ClientSession(connector=connector) as session:
+            # Warm the per-state county lists up front so FIPS resolution in
+            # the row fan-out is a local lookup: one listCounties call per
+            # distinct state instead of one per cold (state, county) pair.
+            # States whose pairs are all in the persistent cache are skipped.
+            keys = self.final_data['State'].astype(str) + "_" + self.final_data['County'].astype(str)
+            cold_states = self.final_data['State'][~keys.isin(fips_cache)].dropna().unique()
+            if len(cold_states):
+                write_progress_file("running", 3, f"Prefetching county lists for {len(cold_states)} states...")
+                await asyncio.gather(*(_list_counties(session, state) for state in cold_states),
+                                     return_exceptions=True)
+
+            with tqdm(total=len(row_data), desc="Fetching HUD data") as pbar:
+                for batch_num in range(total_batches):
+                    if not controller.check_should_continue():
+                        break
+
+                    start_idx = batch_num * batch_size
+                    end_idx = min((batch_num + 1) * batch_size, len(row_data))
+                    batch_data = row_data[start_idx:end_idx]
+
+                    # Update progress
+                    progress_percent = (batch_num / total_batches) * 100
+                    write_progress_file("running", 3, f"Fetching HUD data: {progress_percent:.1f}% complete", start_idx)
+
+                    results = await asyncio.gather(
+                        *[process_hud_row(session, row) for row in batch_data],
+                        return_exceptions=True
+                    )
+                    pbar.update(len(batch_data))
+
+                    # Update dataframe with results
+                    for result in results:
+                        if isinstance(result, Exception) or result is None:
+                            continue
+                        if controller.check_should_continue():
+                            self.final_data.at[result['index'], 'entityid'] = result['entityid']
+                            self.final_data.at[result['index'], 'Income Limits'] = result['Income Limits']
+                            self.final_data.at[result['index'], 'Efficiency'] = result['Efficiency']
+                            self.final_data.at[result['index'], 'OneBedroom'] = result['OneBedroom']
+                            self.final_data.at[result['index'], 'TwoBedroom'] = result['TwoBedroom']
+                            self.final_data.at[result['index'], 'ThreeBedroom'] = result['ThreeBedroom']
+                            self.final_data.at[result['index'], 'FourBedroom'] = result['FourBedroom']
+
+                    if batch_num % 5 == 0:  # Save every 5 batches
+                        self.save_current_state()
+
     def step4_fetch_nar_data(self):
         """Step 4: Fetch NAR median home values"""
         controller.set_current_step(4, "Fetch NAR Data")
@@ -1056,10 +1147,9 @@ class Partners8Pipeline:
             # Clear state file on successful completion
             self.state_manager.clear_state()
             
-            # Clean up progress file
+            # Clean up progress region
             try:
-                if os.path.exists(PROGRESS_FILE):
-                    os.remove(PROGRESS_FILE)
+                cleanup_progress_file()
             except:
                 pass
             
@@ -1077,7 +1167,7 @@ class Partners8Pipeline:
 # =============================================================================
 
 def main():
-    """Main function - simplified without pause/play controls"""
+    """Main function - pause/resume arrive as SIGUSR1/SIGUSR2 from the API"""
     print("🏠 Partners 8 App - Data Pipeline")
     print("=" * 60)
     print("This script will:")
@@ -1089,9 +1179,13 @@ def main():
     print("6. Store data in SQLite database")
     print("=" * 60)
     
-    # Set up signal handler for Ctrl+C
+    # Set up signal handlers: Ctrl+C/stop, plus kernel-delivered pause and
+    # resume from the API process (no stdin pipe involved)
     signal.signal(signal.SIGINT, signal_handler)
-    
+    if hasattr(signal, "SIGUSR1"):
+        signal.signal(signal.SIGUSR1, lambda *_: controller.pause())
+        signal.signal(signal.SIGUSR2, lambda *_: controller.resume())
+
     try:
         # Initialize and run pipeline
         pipeline = Partners8Pipeline()